@@ -6,31 +6,53 @@ from time import perf_counter
 
 from spacy_tokenizer import MultilingualTokenizer
 from wordcloud_visualizer import WordcloudVisualizer
-from plugin_config_loading import load_config_and_data_wordcloud
+from plugin_config_loading import load_plugin_config_wordcloud, iter_input_data_wordcloud
 
 
 # Load config
-params, df = load_config_and_data_wordcloud()
+params = load_plugin_config_wordcloud()
 output_folder = params.output_folder
 output_partition_path = params.output_partition_path
 
+# Load tokenizer in the background while reading the first chunk of data, if the language is known in advance
+tokenizer = MultilingualTokenizer(
+    stopwords_folder_path=params.stopwords_folder_path,
+    pipe_task=MultilingualTokenizer.PIPE_TASK_TOKENIZE,
+    max_batch_num_characters=MultilingualTokenizer.DEFAULT_MAX_BATCH_NUM_CHARACTERS,
+    snapshot_cache_folder_path=params.snapshot_cache_folder_path,
+    segmenter_cache_folder_path=params.segmenter_cache_folder_path,
+)
+prewarm_future = tokenizer.prewarm([params.language]) if not params.language_column else None
+
+# Load data lazily, chunk by chunk
+df_iterator = iter_input_data_wordcloud(params)
+
 # Load wordcloud visualizer
 worcloud_visualizer = WordcloudVisualizer(
-    tokenizer=MultilingualTokenizer(stopwords_folder_path=params.stopwords_folder_path),
+    tokenizer=tokenizer,
     text_column=params.text_column,
     font_folder_path=params.font_folder_path,
     language=params.language,
     language_column=params.language_column,
     subchart_column=params.subchart_column,
+    weight_column=params.weight_column,
     remove_stopwords=params.remove_stopwords,
     remove_punctuation=params.remove_punctuation,
     case_insensitive=params.case_insensitive,
     max_words=params.max_words,
+    max_num_tokens_per_subchart=params.max_num_tokens_per_subchart,
     color_list=params.color_list,
+    n_process=-1 if params.parallel_rendering else 1,
+    # Workers are forked, as spawned workers would import the main module again and this recipe has no main guard
+    multiprocessing_start_method="fork",
+    renderer=WordcloudVisualizer.RENDERER_PIL,
 )
 
-# Prepare data and count tokens for each subchart
-frequencies = worcloud_visualizer.tokenize_and_count(df)
+# Prepare data and count tokens for each subchart, streaming over chunks of data
+frequencies = worcloud_visualizer.tokenize_and_count_chunks(df_iterator)
+if prewarm_future:
+    prewarm_future.result()  # raise tokenizer loading errors, if any
+tokenizer.close()  # stop the prewarm thread before rendering workers are forked
 
 # Clear output folder's target partition
 output_folder.delete_path(output_partition_path)
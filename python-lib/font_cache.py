@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Module with process-wide caches of fonts and word sprites, to speed up the layout of wordclouds"""
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import AnyStr, Any, Hashable, Callable, Tuple
+
+from PIL import Image, ImageFont
+import wordcloud.wordcloud
+
+
+MAX_NUM_FONTS = 1024
+"""int: Maximum number of FreeTypeFont objects kept in memory, one per font file, size and thread"""
+
+MAX_SPRITES_NUM_BYTES = 256 * 10 ** 6
+"""int: Maximum size in bytes of the word measurements and rasterized word masks kept in memory"""
+
+
+class SpriteCache:
+    """Thread-safe cache of word sprites, evicting least recently used sprites beyond a size budget
+
+    Attributes:
+        max_num_bytes (int): Maximum total size in bytes of cached sprites
+        num_bytes (int): Current total size in bytes of cached sprites
+    """
+
+    def __init__(self, max_num_bytes: int = MAX_SPRITES_NUM_BYTES):
+        """Initialization method for the SpriteCache class
+
+        Args:
+            max_num_bytes: Maximum total size in bytes of cached sprites
+        """
+        self.max_num_bytes = max_num_bytes
+        self.num_bytes = 0
+        self._sprites = OrderedDict()  # ordered from least to most recently used, values are (sprite, num_bytes)
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """Return the sprite of a given key, creating and caching it if needed
+
+        Args:
+            key: Key identifying the sprite
+            create: Function without arguments returning the sprite
+
+        Returns:
+            Cached or newly created sprite
+        """
+        with self._lock:
+            if key in self._sprites:
+                self._sprites.move_to_end(key)  # mark as most recently used
+                return self._sprites[key][0]
+        sprite = create()
+        num_bytes = self._estimate_num_bytes(sprite)
+        with self._lock:
+            if key not in self._sprites and num_bytes <= self.max_num_bytes:
+                self._sprites[key] = (sprite, num_bytes)
+                self.num_bytes += num_bytes
+                while self.num_bytes > self.max_num_bytes:
+                    _, (_, evicted_num_bytes) = self._sprites.popitem(last=False)
+                    self.num_bytes -= evicted_num_bytes
+        return sprite
+
+    @staticmethod
+    def _estimate_num_bytes(sprite: Any) -> int:
+        """Estimate the size of a sprite: one byte per pixel for a rasterized mask, else a small constant"""
+        if hasattr(sprite, "size") and isinstance(sprite.size, tuple):
+            return max(1, sprite.size[0] * sprite.size[1])
+        return 64
+
+    def clear(self) -> None:
+        """Remove all cached sprites"""
+        with self._lock:
+            self._sprites.clear()
+            self.num_bytes = 0
+
+
+SPRITE_CACHE = SpriteCache()
+"""SpriteCache: Process-wide cache of word measurements and rasterized word masks, shared by all threads"""
+
+
+@lru_cache(maxsize=MAX_NUM_FONTS)
+def _load_font(font_path: AnyStr, size: int, thread_id: int) -> ImageFont.FreeTypeFont:
+    """Load a font file once per size and per thread, as FreeType font faces must not be used by several threads"""
+    return ImageFont.truetype(font_path, size)
+
+
+def get_font(font: Any = None, size: int = 10, *args, **kwargs) -> ImageFont.FreeTypeFont:
+    """Drop-in replacement of `PIL.ImageFont.truetype`, returning cached fonts when loaded from a file path
+
+    Args:
+        font: Path to a font file, or file-like object
+        size: Font size in pixels
+        *args, **kwargs: Other arguments of `PIL.ImageFont.truetype`, which bypass the cache if set
+
+    Returns:
+        FreeTypeFont object
+    """
+    if args or kwargs or not isinstance(font, str):
+        return ImageFont.truetype(font, size, *args, **kwargs)
+    return _load_font(font, int(size), threading.get_ident())
+
+
+class CachedTransposedFont(ImageFont.TransposedFont):
+    """TransposedFont whose text measurements and rasterized masks are cached in SPRITE_CACHE
+
+    Sprites are keyed by font file, size, orientation, text and arguments, so they are shared across
+    wordclouds and threads. Only cached fonts returned by `get_font` have their sprites cached.
+    """
+
+    def _get_sprite(self, method_name: AnyStr, text: Any, *args, **kwargs) -> Any:
+        """Return the result of a TransposedFont method for a given text, from the cache if possible"""
+        base_method = getattr(super(), method_name)
+        mode = args[0] if args else kwargs.get("mode")
+        if mode == "RGBA" or not isinstance(getattr(self.font, "path", None), str):
+            return base_method(text, *args, **kwargs)  # color masks are modified when drawn, so they are not cached
+        key = (
+            method_name,
+            self.font.path,
+            self.font.size,
+            self.orientation,
+            text,
+            args,
+            tuple(sorted(kwargs.items())),
+        )
+        return SPRITE_CACHE.get_or_create(key, lambda: base_method(text, *args, **kwargs))
+
+    def getbbox(self, text, *args, **kwargs):
+        return self._get_sprite("getbbox", text, *args, **kwargs)
+
+    def getmask(self, text, *args, **kwargs):
+        return self._get_sprite("getmask", text, *args, **kwargs)
+
+    def get_text_size(self, text: AnyStr) -> Tuple[int, int]:
+        """Return the width and height of the mask of a text drawn with this font
+
+        Texts are measured with the base font, as `ImageDraw.textbbox` does not support transposed fonts
+        before Pillow 9.2.
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Tuple (width, height) in pixels, swapped for rotated orientations
+        """
+
+        def measure() -> Tuple[int, int]:
+            left, top, right, bottom = self.font.getbbox(text, anchor="lt")
+            if self.orientation in (Image.ROTATE_90, Image.ROTATE_270):
+                return (bottom - top, right - left)
+            return (right - left, bottom - top)
+
+        if not isinstance(getattr(self.font, "path", None), str):
+            return measure()
+        key = ("get_text_size", self.font.path, self.font.size, self.orientation, text)
+        return SPRITE_CACHE.get_or_create(key, measure)
+
+    if hasattr(ImageFont.TransposedFont, "getsize"):  # used for measurements with older versions of Pillow
+
+        def getsize(self, text, *args, **kwargs):
+            return self._get_sprite("getsize", text, *args, **kwargs)
+
+
+class _CachedImageFontModule:
+    """Replacement of the `PIL.ImageFont` module used by the wordcloud package, with cached fonts and sprites"""
+
+    truetype = staticmethod(get_font)
+    TransposedFont = CachedTransposedFont
+
+    def __getattr__(self, name: AnyStr) -> Any:
+        return getattr(ImageFont, name)
+
+
+def install_font_cache() -> None:
+    """Make the wordcloud package use cached fonts and sprites for all WordCloud objects of this process"""
+    if not isinstance(wordcloud.wordcloud.ImageFont, _CachedImageFontModule):
+        wordcloud.wordcloud.ImageFont = _CachedImageFontModule()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Module with a class to save built spaCy pipelines on disk and load them back quickly"""
+
+import os
+import json
+import shutil
+import logging
+import hashlib
+from typing import AnyStr, Dict, Optional
+from tempfile import mkdtemp
+from time import perf_counter
+
+import spacy
+from spacy.language import Language
+from fastcore.utils import store_attr
+
+
+class PipelineSnapshotCache:
+    """Persistent cache of spaCy Language snapshots, saved on disk with `Language.to_disk`
+
+    Snapshots are keyed by language, spaCy version and any option which changes the built pipeline,
+    so that a snapshot is never reused if one of them changes.
+
+    Attributes:
+        cache_folder_path (str): Path to the folder where snapshots are saved, one subfolder per snapshot
+    """
+
+    def __init__(self, cache_folder_path: AnyStr):
+        """Initialization method for the PipelineSnapshotCache class
+
+        Args:
+            cache_folder_path: Path to the folder where snapshots are saved. It is created on first save if needed.
+        """
+        store_attr()
+
+    @staticmethod
+    def hash_file(file_path: Optional[AnyStr]) -> Optional[AnyStr]:
+        """Return the SHA-256 hash of a file content, or None if the file does not exist"""
+        if not file_path or not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def get_key(self, language: AnyStr, options: Dict) -> AnyStr:
+        """Return the key identifying the snapshot of a spaCy pipeline
+
+        Args:
+            language: Language code in ISO 639-1 format
+            options: JSON-serializable dictionary of options used to build the pipeline
+
+        Returns:
+            Hexadecimal hash of the language, spaCy version and options
+        """
+        key_dict = {"language": language, "spacy_version": spacy.__version__, "options": options}
+        key_json = json.dumps(key_dict, sort_keys=True, default=str)
+        return hashlib.sha256(key_json.encode("utf-8")).hexdigest()[:32]
+
+    def _get_snapshot_path(self, language: AnyStr, key: AnyStr) -> AnyStr:
+        """Return the path of the folder where the snapshot of a given key is saved"""
+        return os.path.join(self.cache_folder_path, f"{language}_{key}")
+
+    def load(self, language: AnyStr, key: AnyStr) -> Optional[Language]:
+        """Load a spaCy pipeline from its snapshot
+
+        Args:
+            language: Language code in ISO 639-1 format
+            key: Key of the snapshot returned by `get_key`
+
+        Returns:
+            spaCy Language instance, or None if there is no snapshot or if it could not be loaded
+        """
+        snapshot_path = self._get_snapshot_path(language, key)
+        if not os.path.isdir(snapshot_path):
+            return None
+        start = perf_counter()
+        try:
+            nlp = spacy.load(snapshot_path)
+        except (ValueError, OSError, KeyError) as e:
+            logging.warning(f"Could not load pipeline snapshot for language '{language}' because of error: '{e}'")
+            return None
+        logging.info(f"Loading pipeline snapshot for language '{language}': done in {perf_counter() - start:.2f} seconds")
+        return nlp
+
+    def save(self, nlp: Language, language: AnyStr, key: AnyStr) -> None:
+        """Save a spaCy pipeline snapshot on disk, without failing if the cache folder is not writable
+
+        The snapshot is first written to a temporary folder, then renamed, so that concurrent
+        processes never load a partially written snapshot.
+
+        Args:
+            nlp: spaCy Language instance to save
+            language: Language code in ISO 639-1 format
+            key: Key of the snapshot returned by `get_key`
+        """
+        snapshot_path = self._get_snapshot_path(language, key)
+        if os.path.isdir(snapshot_path):
+            return
+        temp_snapshot_path = None
+        try:
+            os.makedirs(self.cache_folder_path, exist_ok=True)
+            temp_snapshot_path = mkdtemp(dir=self.cache_folder_path, prefix=f".{language}_")
+            nlp.to_disk(temp_snapshot_path)
+            os.rename(temp_snapshot_path, snapshot_path)
+            logging.info(f"Saved pipeline snapshot for language '{language}' to: {snapshot_path}")
+        except (ValueError, OSError) as e:
+            logging.warning(f"Could not save pipeline snapshot for language '{language}' because of error: '{e}'")
+            if temp_snapshot_path:
+                shutil.rmtree(temp_snapshot_path, ignore_errors=True)
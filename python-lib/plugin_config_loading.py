@@ -3,7 +3,7 @@
 
 import logging
 import os
-from typing import Tuple
+from typing import Tuple, List, Set, AnyStr, Generator
 
 import pandas as pd
 import matplotlib
@@ -18,6 +18,11 @@ from dataiku.customrecipe import (
 from language_support import SUPPORTED_LANGUAGES_SPACY
 from color_palettes import DSS_BUILTIN_COLOR_PALETTES
 from partitions_handling import get_folder_partition_root
+from plugin_io_utils import convert_to_arrow_strings, log_string_storage, get_user_temp_folder_path
+
+
+DEFAULT_CHUNKSIZE = 100000
+"""int: Default number of rows in each chunk of input data, trading memory usage for fewer tokenization restarts"""
 
 
 class PluginParamValidationError(ValueError):
@@ -33,30 +38,33 @@ class PluginParams:
         pass
 
     __slots__ = [
+        "input_dataset",
         "output_folder",
         "output_partition_path",
         "text_column",
         "language",
         "language_column",
         "subchart_column",
+        "parallel_rendering",
+        "weight_column",
         "remove_stopwords",
         "stopwords_folder_path",
+        "snapshot_cache_folder_path",
+        "segmenter_cache_folder_path",
         "font_folder_path",
         "remove_punctuation",
         "case_insensitive",
         "max_words",
+        "max_num_tokens_per_subchart",
         "color_list",
     ]
 
 
-def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
-    """Utility function to:
-        - Validate and load wordcloud parameters into a clean class
-        - Validate input data, keep only necessary columns and drop invalid rows
+def load_plugin_config_wordcloud() -> PluginParams:
+    """Utility function to validate and load wordcloud parameters into a clean class, without reading input data
 
     Returns:
-        - Class instance with parameter names as attributes and associated values
-        - Pandas DataFrame with necessary input data
+        Class instance with parameter names as attributes and associated values
     """
 
     params = PluginParams()
@@ -64,8 +72,8 @@ def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
     input_dataset_names = get_input_names_for_role("input_dataset")
     if len(input_dataset_names) != 1:
         raise PluginParamValidationError("Please specify one input dataset")
-    input_dataset = dataiku.Dataset(input_dataset_names[0])
-    input_dataset_columns = [p["name"] for p in input_dataset.read_schema()]
+    params.input_dataset = dataiku.Dataset(input_dataset_names[0])
+    input_dataset_columns = [p["name"] for p in params.input_dataset.read_schema()]
 
     # Output folder
     output_folder_names = get_output_names_for_role("output_folder")
@@ -111,41 +119,30 @@ def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
         raise PluginParamValidationError(f"Invalid categorical column selection: {subchart_column}")
     params.subchart_column = subchart_column
     logging.info(f"Subcharts column: {params.subchart_column}")
+    params.parallel_rendering = bool(recipe_config.get("parallel_rendering", False) and params.subchart_column)
+    logging.info(f"Parallel rendering: {params.parallel_rendering}")
 
-    # Input dataframe
-    necessary_columns = [
-        column
-        for column in set(
-            [
-                params.text_column,
-                params.language_column,
-                params.subchart_column,
-            ]
-        )
-        if (column not in [None, "order66"])
-    ]
-    df = input_dataset.get_dataframe(columns=necessary_columns).dropna(subset=necessary_columns)
-    if df.empty:
-        raise PluginParamValidationError("Dataframe is empty")
-    # Check if unsupported languages in multilingual case
-    elif params.language_column:
-        languages = set(df[params.language_column].unique())
-        unsupported_lang = languages - SUPPORTED_LANGUAGES_SPACY.keys()
-        if unsupported_lang:
-            raise PluginParamValidationError(
-                f"Found {len(unsupported_lang)} unsupported languages: {', '.join(sorted(unsupported_lang))}"
-            )
-
-    logging.info(f"Read dataset of shape: {df.shape}")
+    # Weights
+    weight_column = recipe_config.get("weight_column")
+    weight_column = None if not weight_column else weight_column
+    if weight_column and (weight_column not in input_dataset_columns):
+        raise PluginParamValidationError(f"Invalid weight column selection: {weight_column}")
+    params.weight_column = weight_column
+    logging.info(f"Weight column: {params.weight_column}")
 
     # Text simplification parameters
     params.remove_stopwords = recipe_config.get("remove_stopwords")
     params.stopwords_folder_path = os.path.join(get_recipe_resource(), "stopwords") if params.remove_stopwords else None
+    cache_folder_path = get_user_temp_folder_path("dss-plugin-nlp-visualization")
+    params.snapshot_cache_folder_path = os.path.join(cache_folder_path, "spacy")
+    params.segmenter_cache_folder_path = os.path.join(cache_folder_path, "segmenters")
     params.font_folder_path = os.path.join(get_recipe_resource(), "fonts")
     params.remove_punctuation = recipe_config.get("remove_punctuation")
     params.case_insensitive = recipe_config.get("case_insensitive")
     logging.info(f"Remove stopwords: {params.remove_stopwords}")
     logging.info(f"Stopwords folder path: {params.stopwords_folder_path}")
+    logging.info(f"Tokenizer snapshot cache folder path: {params.snapshot_cache_folder_path}")
+    logging.info(f"Word segmenter cache folder path: {params.segmenter_cache_folder_path}")
     logging.info(f"Fonts folder path: {params.font_folder_path}")
     logging.info(f"Remove punctuation: {params.remove_punctuation}")
     logging.info(f"Case-insensitive: {params.case_insensitive}")
@@ -156,6 +153,16 @@ def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
         raise PluginParamValidationError("Maximum number of words is not a positive integer")
     params.max_words = max_words
     logging.info(f"Max number of words: {params.max_words}")
+    if recipe_config.get("approximate_counting"):
+        max_num_tokens_per_subchart = recipe_config.get("max_num_tokens_per_subchart")
+        if not (isinstance(max_num_tokens_per_subchart, int) and (max_num_tokens_per_subchart >= max_words)):
+            raise PluginParamValidationError(
+                "Memory budget of approximate counting is not an integer greater than the maximum number of words"
+            )
+        params.max_num_tokens_per_subchart = max_num_tokens_per_subchart
+    else:
+        params.max_num_tokens_per_subchart = None
+    logging.info(f"Max number of tokens per subchart: {params.max_num_tokens_per_subchart}")
 
     color_palette = recipe_config.get("color_palette")
     if not color_palette:
@@ -177,4 +184,108 @@ def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
         params.color_list = selected_palette_dict["colors"]
         logging.info(f"Using built-in DSS palette: '{selected_palette_dict['name']}' with colors: {params.color_list}")
 
+    return params
+
+
+def get_necessary_columns_wordcloud(params: PluginParams) -> List[AnyStr]:
+    """Utility function to list the input columns needed to compute wordclouds"""
+    return [
+        column
+        for column in set(
+            [
+                params.text_column,
+                params.language_column,
+                params.subchart_column,
+                params.weight_column,
+            ]
+        )
+        if (column not in [None, "order66"])
+    ]
+
+
+def validate_languages_wordcloud(languages: Set[AnyStr]) -> None:
+    """Utility function to raise an error if some languages are not supported"""
+    unsupported_lang = languages - SUPPORTED_LANGUAGES_SPACY.keys()
+    if unsupported_lang:
+        raise PluginParamValidationError(
+            f"Found {len(unsupported_lang)} unsupported languages: {', '.join(sorted(unsupported_lang))}"
+        )
+
+
+def load_input_data_wordcloud(params: PluginParams) -> pd.DataFrame:
+    """Utility function to validate input data, keep only necessary columns and drop invalid rows
+
+    Args:
+        params: Class instance with validated parameters, returned by `load_plugin_config_wordcloud`
+
+    Returns:
+        Pandas DataFrame with necessary input data
+    """
+    necessary_columns = get_necessary_columns_wordcloud(params)
+    df = params.input_dataset.get_dataframe(columns=necessary_columns).dropna(subset=necessary_columns)
+    df[params.text_column] = convert_to_arrow_strings(df[params.text_column])
+    log_string_storage(df[params.text_column])
+    if df.empty:
+        raise PluginParamValidationError("Dataframe is empty")
+    # Check if unsupported languages in multilingual case
+    elif params.language_column:
+        validate_languages_wordcloud(set(df[params.language_column].unique()))
+
+    logging.info(f"Read dataset of shape: {df.shape}")
+    return df
+
+
+def iter_input_data_wordcloud(
+    params: PluginParams, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Generator[pd.DataFrame, None, None]:
+    """Utility function to read input data by chunks, keeping only necessary columns and dropping invalid rows
+
+    Languages are validated incrementally as chunks are read, so that the whole dataset never needs to fit in memory.
+    Columns are read with their schema types, so that subchart values have the same type across chunks.
+    Integer columns are read as nullable integers, so that missing values of an integer weight or subchart column
+    do not fail the read, and the corresponding rows are dropped. Weights are then converted to floats.
+
+    Args:
+        params: Class instance with validated parameters, returned by `load_plugin_config_wordcloud`
+        chunksize: Number of rows in each chunk
+
+    Yields:
+        Pandas DataFrame with necessary input data, one per non-empty chunk
+    """
+    necessary_columns = get_necessary_columns_wordcloud(params)
+    validated_languages = set()
+    num_rows = 0
+    for df in params.input_dataset.iter_dataframes(
+        chunksize=chunksize, infer_with_pandas=False, use_nullable_integers=True, columns=necessary_columns
+    ):
+        df = df.dropna(subset=necessary_columns)
+        if params.weight_column:
+            df[params.weight_column] = df[params.weight_column].astype("float64")
+        df[params.text_column] = convert_to_arrow_strings(df[params.text_column])
+        if not num_rows:
+            log_string_storage(df[params.text_column])
+        # Check if unsupported languages in multilingual case
+        if params.language_column:
+            new_languages = set(df[params.language_column].unique()) - validated_languages
+            validate_languages_wordcloud(new_languages)
+            validated_languages.update(new_languages)
+        num_rows += len(df.index)
+        if not df.empty:
+            yield df
+    if not num_rows:
+        raise PluginParamValidationError("Dataframe is empty")
+    logging.info(f"Read dataset of shape: {(num_rows, len(necessary_columns))}")
+
+
+def load_config_and_data_wordcloud() -> Tuple[PluginParams, pd.DataFrame]:
+    """Utility function to:
+        - Validate and load wordcloud parameters into a clean class
+        - Validate input data, keep only necessary columns and drop invalid rows
+
+    Returns:
+        - Class instance with parameter names as attributes and associated values
+        - Pandas DataFrame with necessary input data
+    """
+    params = load_plugin_config_wordcloud()
+    df = load_input_data_wordcloud(params)
     return params, df
@@ -2,8 +2,19 @@
 """Module with read/write utility functions which are *not* based on the Dataiku API"""
 
 import re
+import os
+import stat
+import logging
+import getpass
+from tempfile import gettempdir, mkdtemp
 from typing import List, AnyStr
 
+import pandas as pd
+
+
+SENTENCE_BOUNDARY_REGEX = re.compile(r"[.!?]\s+|[\n。！？]")
+WHITESPACE_REGEX = re.compile(r"\s+")
+
 
 def truncate_text_list(text_list: List[AnyStr], num_characters: int = 140) -> List[AnyStr]:
     """Truncate a list of strings to a given number of characters
@@ -25,6 +36,38 @@ def truncate_text_list(text_list: List[AnyStr], num_characters: int = 140) -> Li
     return output_text_list
 
 
+def split_text(text: AnyStr, max_num_characters: int) -> List[AnyStr]:
+    """Split a text into chunks of at most a given number of characters, at sentence or whitespace boundaries
+
+    Each chunk ends after the last sentence boundary within the limit if any, else after the last whitespace,
+    else it is cut at the limit. Joining the chunks gives back the original text.
+
+    Args:
+        text: Input string
+        max_num_characters: Maximum number of characters of each chunk
+
+    Returns:
+       List of chunks, with a single chunk if the text is short enough
+
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > max_num_characters:
+        window = text[start : start + max_num_characters]
+        end = 0
+        for match in SENTENCE_BOUNDARY_REGEX.finditer(window):
+            end = match.end()
+        if not end:
+            for match in WHITESPACE_REGEX.finditer(window):
+                end = match.end()
+        if not end:
+            end = max_num_characters
+        chunks.append(window[:end])
+        start += end
+    chunks.append(text[start:])
+    return chunks
+
+
 def generate_unique(name: AnyStr, existing_names: List[AnyStr], prefix: AnyStr = None) -> AnyStr:
     """Generate a unique name among existing ones by suffixing a number and adding a prefix
 
@@ -49,3 +92,83 @@ def generate_unique(name: AnyStr, existing_names: List[AnyStr], prefix: AnyStr =
             return new_name
         new_name = f"{new_name}_{j}"
     raise RuntimeError(f"Failed to generated a unique name for '{name}'")
+
+
+def get_user_temp_folder_path(name: AnyStr) -> AnyStr:
+    """Return the path of a private folder in the temporary directory for the current user, creating it if needed
+
+    Temporary folders shared by several users would be owned by the first user to create them,
+    so that other users could not write to them, for instance with Dataiku user isolation.
+    As the path is predictable, the folder is created with mode 0o700, and an existing folder is only used
+    if it is a directory owned by the current user and not writable by others, else a new private temporary folder
+    is used, so that files written by other users (e.g. pipeline snapshots) are never loaded.
+
+    Args:
+        name: Name of the folder, suffixed by the user id
+
+    Returns:
+       Path of the folder
+
+    """
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    folder_path = os.path.join(gettempdir(), f"{name}-{user}")
+    try:
+        os.mkdir(folder_path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        fallback_folder_path = mkdtemp(prefix=f"{name}-")
+        logging.warning(
+            f"Could not create folder '{folder_path}' because of error: '{e}', using: {fallback_folder_path}"
+        )
+        return fallback_folder_path
+    if hasattr(os, "getuid"):
+        folder_stat = os.lstat(folder_path)
+        if (
+            not stat.S_ISDIR(folder_stat.st_mode)
+            or folder_stat.st_uid != os.getuid()
+            or folder_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+        ):
+            fallback_folder_path = mkdtemp(prefix=f"{name}-")
+            logging.warning(
+                f"Folder '{folder_path}' is not a private folder of the current user, using: {fallback_folder_path}"
+            )
+            return fallback_folder_path
+    return folder_path
+
+
+def log_string_storage(series: pd.Series) -> None:
+    """Log whether a Series of strings is stored as Arrow strings or as Python objects
+
+    Args:
+        series: pandas Series of strings, as returned by `convert_to_arrow_strings`
+
+    """
+    if getattr(series.dtype, "storage", None) == "pyarrow":
+        logging.info(f"Column '{series.name}' is stored as Arrow strings")
+    else:
+        logging.info(
+            f"Column '{series.name}' is stored as Python objects, "
+            + "as pyarrow is not installed or not supported by the installed version of pandas"
+        )
+
+
+def convert_to_arrow_strings(series: pd.Series) -> pd.Series:
+    """Convert a Series of strings to Arrow-backed storage, if the optional pyarrow dependency is available
+
+    Arrow stores all strings in contiguous buffers instead of one Python object per string, which reduces memory
+    usage and allows vectorized handling of missing values. pyarrow is part of the plugin code environment
+    for Python 3.9 and above only, as the pandas versions of older Python versions do not support Arrow strings.
+
+    Args:
+        series: pandas Series of strings, with possible missing values
+
+    Returns:
+       Series with the "string[pyarrow]" dtype, or the input Series unchanged if pyarrow is not installed
+            or not supported by the installed version of pandas
+
+    """
+    try:
+        return series.astype("string[pyarrow]")
+    except (ImportError, TypeError):
+        return series
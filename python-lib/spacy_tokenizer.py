@@ -4,15 +4,23 @@
 import regex as re
 import os
 import logging
-from typing import List, AnyStr, Union, Optional
+import multiprocessing
+import threading
+from multiprocessing.pool import Pool
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, AnyStr, Union, Optional, Iterable, Iterator, Generator, Tuple
+from itertools import chain
+from collections import deque, OrderedDict
 from time import perf_counter
+from functools import lru_cache
 from tempfile import mkdtemp
 
+import numpy as np
 import pandas as pd
 
 import spacy
 from spacy.language import Language
-from spacy.tokens import Doc, Token
+from spacy.tokens import Doc, DocBin, Token
 from spacy.vocab import Vocab
 from spacy.lang.zh import Chinese
 from emoji import UNICODE_EMOJI
@@ -26,7 +34,9 @@ from language_support import (
     SPACY_LANGUAGE_MODELS_LEMMATIZATION,
     SPACY_LANGUAGE_MODELS_MORPHOLOGIZER,
 )
-from plugin_io_utils import generate_unique, truncate_text_list
+from plugin_io_utils import generate_unique, truncate_text_list, split_text, get_user_temp_folder_path
+from pipeline_snapshot_cache import PipelineSnapshotCache
+from utils import get_num_available_cpus
 
 
 # Setting custom spaCy token extensions to allow for easier filtering in downstream tasks
@@ -100,6 +110,32 @@ class TokenizationError(RuntimeError):
     pass
 
 
+_READY_SEGMENTERS = {}
+"""Languages whose third-party word segmenter (jieba, Sudachi or PyThaiNLP) is already set up in this process (key)
+and segmenter cache folder used to set them up (value)"""
+
+_WORKER_TOKENIZER = None
+"""MultilingualTokenizer instance used by each worker process when tokenizing with multiple processes"""
+
+
+def _initialize_worker(tokenizer: "MultilingualTokenizer") -> None:
+    """Initializer of worker processes: store the (pickled) tokenizer as a process-wide global"""
+    global _WORKER_TOKENIZER
+    _WORKER_TOKENIZER = tokenizer
+
+
+def _tokenize_batch_in_worker(text_list: List[AnyStr], language: AnyStr) -> bytes:
+    """Tokenize a batch of texts in a worker process and return the documents serialized as DocBin bytes
+
+    Sending back compact DocBin bytes is much cheaper than pickling each spaCy Doc with its own Vocab.
+    """
+    _WORKER_TOKENIZER.add_spacy_tokenizer(language)
+    doc_bin = DocBin(store_user_data=False)
+    for doc in _WORKER_TOKENIZER.spacy_nlp_dict[language].pipe(text_list, batch_size=len(text_list)):
+        doc_bin.add(doc)
+    return doc_bin.to_bytes()
+
+
 class MultilingualTokenizer:
     """Wrapper class to handle tokenization with spaCy for multiple languages
     Attributes:
@@ -107,23 +143,62 @@ class MultilingualTokenizer:
             Files should be named "{language_code}.txt" with the code in ISO 639-1 format
         use_models (bool): If True, load spaCy models for available languages.
             Slower but adds additional tagging capabilities to the pipeline.
+        pipe_task (str, optional): Task for which pre-trained models are loaded: "tokenize" or "lemmatize"
         hashtags_as_token (bool): Treat hashtags as one token instead of two
         batch_size (int): Number of documents to process in spaCy pipelines
+        max_batch_num_characters (int, optional): Maximum number of characters in a batch of documents
+        sort_by_length (bool): If True, texts are tokenized in batches of similar lengths
         max_num_characters (int): Maximum number of characters in a single text
+        max_chunk_num_characters (int): Maximum number of characters in a single chunk of text, see `tokenize_chunks_iter`
+        n_process (int): Number of processes to tokenize documents in parallel, -1 to use all available CPUs
+        multiprocessing_start_method (str): Start method of the worker processes: "spawn", "forkserver" or "fork"
+        snapshot_cache_folder_path (str, optional): Path to a folder where snapshots of built spaCy pipelines are cached
+        segmenter_cache_folder_path (str, optional): Path to a folder where word segmenters of zh/ja/th keep data files
+        max_num_pipelines (int, optional): Maximum number of spaCy Language instances kept in memory at once
+        max_pipelines_num_bytes (int, optional): Maximum estimated size in bytes of spaCy Language instances in memory
         add_pipe_components (list): List of spaCy pipeline components to add, for instance "sentencizer"
         enable_pipe_components (list, optional): List of spaCy pipeline components to enable
         disable_pipe_components (list, optional): List of spaCy pipeline components to disable.
         config (dict): Dictionary for SpaCy component(key) and its associated SpaCy.Language.config dictionary (value)
             This config dictionary contains metadatas about the component.
             If empty, uses SpaCy default config, describing the default values of the factory arguments
-        spacy_nlp_dict (dict): Dictionary holding spaCy Language instances (value) by language code (key)
+        spacy_nlp_dict (OrderedDict): Dictionary holding spaCy Language instances (value) by language code (key)
+            ordered from least to most recently used
         tokenized_column (str): Name of the dataframe column storing tokenized documents
     """
 
+    PIPE_TASK_TOKENIZE = "tokenize"
+    PIPE_TASK_LEMMATIZE = "lemmatize"
+    MODEL_COMPONENTS = [
+        "tok2vec",
+        "tagger",
+        "morphologizer",
+        "parser",
+        "senter",
+        "attribute_ruler",
+        "lemmatizer",
+        "ner",
+    ]
+    """list: Components of the pre-trained spaCy models in SPACY_LANGUAGE_MODELS, which may be excluded at loading"""
     DEFAULT_BATCH_SIZE = 1000
+    DEFAULT_MAX_BATCH_NUM_CHARACTERS = 10 ** 6
+    # Number of batches over which texts are sorted by length, if sort_by_length is True
+    LENGTH_BUCKETS_NUM_BATCHES = 16
     MAX_NUM_CHARACTERS = 10 ** 7
+    MAX_CHUNK_NUM_CHARACTERS = 10 ** 5
     # Set to 1 to prevent pickling issues when spawning multiple processes on MacOS
     DEFAULT_NUM_PROCESS = 1
+    # "spawn" is available on all platforms and does not inherit the state of threads from the parent process
+    DEFAULT_MULTIPROCESSING_START_METHOD = "spawn"
+    # Maximum time in seconds for worker processes to start, after which they are considered crashed
+    WORKER_STARTUP_TIMEOUT = 300
+    # Approximate memory footprint of a lexeme with its string, and of an entry of a lookups table
+    NUM_BYTES_PER_LEXEME = 512
+    NUM_BYTES_PER_LOOKUPS_ENTRY = 512
+    # Name of the private temporary folder used if no segmenter cache folder is set, see `get_user_temp_folder_path`
+    DEFAULT_SEGMENTER_CACHE_FOLDER_NAME = "spacy-segmenters"
+    # Languages tokenized by third-party word segmenters with an expensive dictionary setup
+    SEGMENTER_LANGUAGES = {"zh", "ja", "th"}
     DEFAULT_FILTER_TOKEN_ATTRIBUTES = {
         "is_space": "Whitespace",
         "is_punct": "Punctuation",
@@ -148,9 +223,19 @@ class MultilingualTokenizer:
         self,
         stopwords_folder_path: Optional[AnyStr] = None,
         use_models: bool = False,
+        pipe_task: Optional[AnyStr] = None,
         hashtags_as_token: bool = True,
         batch_size: int = DEFAULT_BATCH_SIZE,
+        max_batch_num_characters: Optional[int] = None,
+        sort_by_length: bool = False,
         max_num_characters: int = MAX_NUM_CHARACTERS,
+        max_chunk_num_characters: int = MAX_CHUNK_NUM_CHARACTERS,
+        n_process: int = DEFAULT_NUM_PROCESS,
+        multiprocessing_start_method: AnyStr = DEFAULT_MULTIPROCESSING_START_METHOD,
+        snapshot_cache_folder_path: Optional[AnyStr] = None,
+        segmenter_cache_folder_path: Optional[AnyStr] = None,
+        max_num_pipelines: Optional[int] = None,
+        max_pipelines_num_bytes: Optional[int] = None,
         add_pipe_components: List[str] = [],
         enable_pipe_components: Optional[Union[List[str], str]] = None,
         disable_pipe_components: Optional[Union[List[str], str]] = None,
@@ -162,12 +247,56 @@ class MultilingualTokenizer:
                 Files should be named "{language_code}.txt" with the code in ISO 639-1 format.
             use_models (bool): If True, loads spaCy models, which is slower but allows to retrieve
                 Part-of-Speech and Entities tags for downstream tasks. Default is False.
+            pipe_task (str, optional): Task for which pre-trained models are loaded, to load only the components
+                it needs. With "tokenize", models are skipped and blank languages are used instead, except for
+                Chinese whose model brings its own word segmenter. With "lemmatize", only the components returned by
+                `_get_components_to_activate_lemmatization` are loaded, other components are excluded up front
+                so that their weights are never loaded in memory. Default is None, which loads all components.
             hashtags_as_token (bool): Treat hashtags as one token instead of two.
                 Default is True, which overrides the spaCy default behavior.
             batch_size (int): Number of documents to process in spaCy pipelines.
                 Default is set by the DEFAULT_BATCH_SIZE class constant.
+            max_batch_num_characters (int, optional): Maximum number of characters in a batch of documents.
+                If set, batches are sized by this character budget instead of `batch_size`, so that batches of long
+                documents stay small while batches of short documents get larger. Each document counts for its
+                length plus one character. A good value is set by the DEFAULT_MAX_BATCH_NUM_CHARACTERS class constant.
+                Default is None, which means batches of `batch_size` documents.
+            sort_by_length (bool): If True, texts are sorted by length over windows of LENGTH_BUCKETS_NUM_BATCHES
+                batches, so that each batch contains texts of similar lengths, which reduces padding in spaCy models.
+                Documents are still yielded in input order. Default is False.
             max_num_characters (int): Maximum number of characters in a single text.
                 Default is 10 million, higher than spaCy more conservative default at 1 million.
+            max_chunk_num_characters (int): Maximum number of characters in a single chunk of text,
+                when texts are split at sentence or whitespace boundaries by `tokenize_chunks_iter`.
+                Default is 100 thousand, so that memory usage per spaCy document stays bounded.
+            n_process (int): Number of processes to tokenize documents in parallel, -1 to use all available CPUs.
+                Default is set by the DEFAULT_NUM_PROCESS class constant.
+                If higher than 1, documents are sharded in batches of `batch_size` documents and sent to a pool
+                of worker processes, which send back documents serialized as DocBin bytes.
+                Workers build their own pipelines with the same parameters, and replay the lemmatization components
+                activated by `_activate_components_to_lemmatize`. Pipelines changed in any other way after their
+                creation cannot be used with several processes, a TokenizationError is raised.
+                With the "spawn" and "forkserver" start methods, workers import the main module again,
+                so the calling script must be protected by an `if __name__ == "__main__":` guard.
+                Otherwise workers crash at startup and a TokenizationError is raised after WORKER_STARTUP_TIMEOUT.
+            multiprocessing_start_method (str): Start method of the worker processes: "spawn", "forkserver" or "fork".
+                Default is "spawn", which is safe on all platforms.
+            snapshot_cache_folder_path (str, optional): Path to a folder where snapshots of built spaCy pipelines
+                are cached on disk, to load them in milliseconds on the next runs instead of building them again.
+                Snapshots are keyed by language, spaCy version, stopwords file content and tokenizer options.
+                Default is None, which disables the cache.
+            segmenter_cache_folder_path (str, optional): Path to a folder where the word segmenters of Chinese (jieba),
+                Japanese (Sudachi) and Thai (PyThaiNLP) keep their data files, for instance the prebuilt jieba
+                dictionary cache, so that they are reused across runs instead of being rebuilt.
+                Default is None, which uses a private temporary folder of the current user,
+                named after the DEFAULT_SEGMENTER_CACHE_FOLDER_NAME class constant.
+            max_num_pipelines (int, optional): Maximum number of spaCy Language instances kept in memory at once.
+                Least recently used instances are evicted first. Default is None, which means no limit.
+            max_pipelines_num_bytes (int, optional): Maximum size in bytes of spaCy Language instances kept in memory,
+                estimated from the weights, vectors, lookups tables and vocabulary of each pipeline,
+                see `_estimate_pipeline_num_bytes`.
+                Least recently used instances are evicted first. Default is None, which means no limit.
+                Use with snapshot_cache_folder_path so that evicted instances are quickly reloaded when needed again.
             add_pipe_components (list): List of spaCy pipeline components to add, for instance "sentencizer".
                 If use_models is False, only the tokenizer component is present so other components must be added explicitly.
                 If use_models is True, several pipeline components are automatically added.
@@ -184,8 +313,16 @@ class MultilingualTokenizer:
                 If empty, uses SpaCy default config, describing the default values of the factory arguments
         """
         store_attr()
-        self.spacy_nlp_dict = {}
+        self.spacy_nlp_dict = OrderedDict()  # ordered from least to most recently used
         self.tokenized_column = None  # may be changed by tokenize_df
+        self._process_pool = None  # multiprocessing.Pool created lazily by _get_process_pool
+        self._prewarm_executor = None  # ThreadPoolExecutor created lazily by prewarm
+        self._lock = threading.RLock()  # prevents concurrent creation of spaCy tokenizers from several threads
+        self._snapshot_cache = (
+            PipelineSnapshotCache(self.snapshot_cache_folder_path) if self.snapshot_cache_folder_path else None
+        )
+        self._lemmatized_languages = set()  # languages whose lemmatization components were activated
+        self._pipeline_states = {}  # components of each spaCy Language once created, see _get_pipeline_state
         self._restore_pipe_components = {}
         """spacy.language.DisabledPipes object initialized in create_spacy_tokenizer()
         Contains the components of each SpaCy.Language object that have been disabled by spacy.Languages.select_pipes() method.
@@ -196,6 +333,67 @@ class MultilingualTokenizer:
             raise ValueError(
                 "Only one of enable_pipe_components and disable_pipe_components can be specified at once."
             )
+        if self.pipe_task not in {None, self.PIPE_TASK_TOKENIZE, self.PIPE_TASK_LEMMATIZE}:
+            raise ValueError(f"Unsupported pipe task: '{self.pipe_task}'")
+
+    def __getstate__(self) -> dict:
+        """Return the state to pickle when sending the tokenizer to worker processes
+
+        spaCy Language instances and the process pool are not pickled, workers create their own spaCy Language
+        instances lazily with the same parameters and lemmatization components.
+        """
+        state = self.__dict__.copy()
+        state["spacy_nlp_dict"] = OrderedDict()
+        state["_pipeline_states"] = {}
+        state["_restore_pipe_components"] = {}
+        state["_process_pool"] = None
+        state["_prewarm_executor"] = None
+        state["n_process"] = 1
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the tokenizer state after unpickling"""
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def _get_num_process(self) -> int:
+        """Return the number of processes to use for tokenization"""
+        if self.n_process == -1:
+            return get_num_available_cpus()
+        return max(1, self.n_process)
+
+    def _get_process_pool(self) -> Pool:
+        """Return the pool of worker processes used for tokenization, creating it on first call"""
+        if self._process_pool is None:
+            num_process = self._get_num_process()
+            logging.info(
+                f"Starting {num_process} tokenization worker processes with '{self.multiprocessing_start_method}' method"
+            )
+            context = multiprocessing.get_context(self.multiprocessing_start_method)
+            process_pool = context.Pool(processes=num_process, initializer=_initialize_worker, initargs=(self,))
+            # Workers crashing at startup are restarted forever by the pool, so results would never come back
+            try:
+                process_pool.apply_async(os.getpid).get(timeout=self.WORKER_STARTUP_TIMEOUT)
+            except multiprocessing.TimeoutError:
+                process_pool.terminate()
+                raise TokenizationError(
+                    f"Tokenization worker processes did not start within {self.WORKER_STARTUP_TIMEOUT} seconds. "
+                    f"With the '{self.multiprocessing_start_method}' start method, the main script must be protected "
+                    "by an `if __name__ == '__main__':` guard"
+                )
+            self._process_pool = process_pool
+        return self._process_pool
+
+    def close(self) -> None:
+        """Public method to terminate the worker processes and threads, if any. They are restarted if needed"""
+        if self._process_pool is not None:
+            self._process_pool.close()
+            self._process_pool.join()
+            self._process_pool = None
+        if self._prewarm_executor is not None:
+            self._prewarm_executor.shutdown(wait=True)
+            self._prewarm_executor = None
 
     def _set_use_models(self, languages: List[AnyStr]) -> bool:
         """Set self.use_models attribute to True in case the text should be lemmatize with a SpaCy pre-trained model.
@@ -230,7 +428,7 @@ class MultilingualTokenizer:
         - Else: Add a Lemmatizer in the available mode 'rule' or 'lookup'
         (cf https://github.com/explosion/spacy-lookups-data/tree/master/spacy_lookups_data/data )
         """
-        if self.use_models and language in SPACY_LANGUAGE_MODELS_LEMMATIZATION:
+        if self._uses_model(language) and language in SPACY_LANGUAGE_MODELS_LEMMATIZATION:
             # When using a pre-trained model
             components_to_activate = self._get_components_to_activate_lemmatization(language)
             if language in self._restore_pipe_components:
@@ -249,9 +447,156 @@ class MultilingualTokenizer:
         else:
             # unsupported cases
             raise ValueError(self._get_error_message_lemmatization(language))
+        # Replayed when the spaCy Language is created again, in worker processes or after eviction
+        self._lemmatized_languages.add(language)
+        self._pipeline_states[language] = self._get_pipeline_state(self.spacy_nlp_dict[language])
+
+    @staticmethod
+    def _get_pipeline_state(nlp: Language) -> Tuple:
+        """Return the names of all components of a spaCy Language and of its disabled components"""
+        return (tuple(nlp.component_names), tuple(nlp.disabled))
+
+    def _uses_model(self, language: AnyStr) -> bool:
+        """Private method to check if a pre-trained model is loaded for a given language, depending on the pipe task"""
+        if not self.use_models or language not in SPACY_LANGUAGE_MODELS:
+            return False
+        # Chinese models bring their own word segmenter, so tokenization differs from the blank language
+        return self.pipe_task != self.PIPE_TASK_TOKENIZE or language == "zh"
+
+    def _get_model_components_to_exclude(self, language: AnyStr) -> List[AnyStr]:
+        """Private method to list the components of a pre-trained model which are not needed for the pipe task
+        Excluded components are never loaded, contrary to components disabled by `select_pipes` which stay in memory.
+        """
+        if not self._uses_model(language):
+            return []
+        if self.pipe_task == self.PIPE_TASK_TOKENIZE:
+            components_to_keep = []
+        elif self.pipe_task == self.PIPE_TASK_LEMMATIZE and language in SPACY_LANGUAGE_MODELS_LEMMATIZATION:
+            components_to_keep = self._get_components_to_activate_lemmatization(language)
+        else:
+            return []
+        enable_pipe_components = self.enable_pipe_components or []
+        if isinstance(enable_pipe_components, str):
+            enable_pipe_components = [enable_pipe_components]
+        components_to_keep = set(components_to_keep) | set(enable_pipe_components)
+        return [component for component in self.MODEL_COMPONENTS if component not in components_to_keep]
+
+    def _get_snapshot_key(self, language: AnyStr) -> AnyStr:
+        """Private method to compute the key of the pipeline snapshot for a given language
+
+        The key depends on all options which change the pipeline built by `_build_spacy_tokenizer`,
+        plus the content of the stopwords file, which is applied to the vocabulary after loading.
+        """
+        options = {
+            "use_models": self.use_models,
+            "model_version": spacy.util.get_package_version(SPACY_LANGUAGE_MODELS[language])
+            if self._uses_model(language)
+            else None,
+            "model_excluded_components": self._get_model_components_to_exclude(language),
+            "hashtags_as_token": self.hashtags_as_token,
+            "add_pipe_components": self.add_pipe_components,
+            "config": self.config,
+            "stopwords_hash": PipelineSnapshotCache.hash_file(
+                os.path.join(self.stopwords_folder_path, f"{language}.txt") if self.stopwords_folder_path else None
+            ),
+        }
+        return self._snapshot_cache.get_key(language, options)
+
+    def _build_spacy_tokenizer(self, language: AnyStr) -> Language:
+        """Private method to build a custom spaCy tokenizer for a given language from scratch
+        Args:
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Returns:
+            spaCy Language instance with the tokenizer, before pipe selection and stopword customization
+        Raises:
+            ValueError, OSError: If something went wrong with the tokenizer creation
+        """
+        if self._uses_model(language):
+            nlp = spacy.load(SPACY_LANGUAGE_MODELS[language], exclude=self._get_model_components_to_exclude(language))
+        # Since v3, spaCy uses char tokenization by default for Chinese, not jieba anymore
+        # See https://github.com/explosion/spaCy/blob/e1f88de729f113f068958c824cf01026363bb110/spacy/lang/zh/__init__.py
+        # If a model is selected, jieba is not needed - see https://github.com/explosion/spaCy/discussions/8577#discussioncomment-955726
+        elif language == "zh":
+            nlp = Chinese.from_config({"nlp": {"tokenizer": {"segmenter": "jieba"}}})
+        else:
+            nlp = spacy.blank(language)  # spaCy language without models (https://spacy.io/usage/models)
+        nlp.max_length = self.max_num_characters
+        for component in self.add_pipe_components:
+            nlp.add_pipe(
+                component,
+                config=self.config[component] if component in self.config else {},
+            )
+        # if self.config is None, uses SpaCy default config, describing the default values of the factory arguments
+        if not self._uses_model(language):
+            nlp.initialize()
+        if self.hashtags_as_token:
+            re_token_match = spacy.tokenizer._get_regex_pattern(nlp.Defaults.token_match)
+            re_token_match = r"""({re_token_match}|#\w+)"""
+            nlp.tokenizer.token_match = re.compile(re_token_match).match
+            _prefixes = list(nlp.Defaults.prefixes)
+            if "#" in _prefixes:
+                _prefixes.remove("#")
+                nlp.tokenizer.prefix_search = spacy.util.compile_prefix_regex(_prefixes).search
+        return nlp
+
+    def _setup_segmenter(self, language: AnyStr) -> None:
+        """Private method to set up the third-party word segmenter of a given language once per process
+
+        Dictionaries are loaded once and kept in data files under `segmenter_cache_folder_path`,
+        so that next spaCy tokenizers and next runs reuse them instead of loading them from scratch:
+        - zh: jieba dictionary cache file, built on the first run and loaded directly afterwards
+        - ja: Sudachi tokenizers shared by all spaCy tokenizers with the same split mode
+        - th: stable PyThaiNLP data directory, with the word dictionary loaded in advance
+
+        Segmenters are set up again if another tokenizer uses a different `segmenter_cache_folder_path`.
+        As their settings are process-wide, data files are then kept in the folder of the last tokenizer.
+        If the folder cannot be created, a private temporary folder is used instead.
+
+        Args:
+            language: Language code in ISO 639-1 format, among SEGMENTER_LANGUAGES
+        """
+        if _READY_SEGMENTERS.get(language) == self.segmenter_cache_folder_path:
+            return
+        start = perf_counter()
+        logging.info(f"Setting up word segmenter for language '{language}'...")
+        segmenter_folder_path = os.path.join(
+            self.segmenter_cache_folder_path or get_user_temp_folder_path(self.DEFAULT_SEGMENTER_CACHE_FOLDER_NAME),
+            language,
+        )
+        try:
+            os.makedirs(segmenter_folder_path, exist_ok=True)
+        except OSError as e:
+            segmenter_folder_path = mkdtemp(prefix=f"spacy-segmenter-{language}-")
+            logging.warning(
+                f"Could not create segmenter cache folder for language '{language}' because of error: '{e}', "
+                + f"using temporary folder instead: {segmenter_folder_path}"
+            )
+        if language == "zh":
+            import jieba
+
+            jieba.dt.tmp_dir = segmenter_folder_path
+            jieba.initialize()
+        elif language == "ja":
+            import spacy.lang.ja
+
+            # JapaneseTokenizer creates a new Sudachi tokenizer (and loads its dictionary) at each initialization
+            if not hasattr(spacy.lang.ja.try_sudachi_import, "cache_info"):
+                spacy.lang.ja.try_sudachi_import = lru_cache(maxsize=None)(spacy.lang.ja.try_sudachi_import)
+        elif language == "th":
+            # PyThaiNLP requires a "data directory" even if nothing needs to be downloaded
+            os.environ["PYTHAINLP_DATA_DIR"] = segmenter_folder_path
+            from pythainlp.tokenize import word_tokenize
+
+            word_tokenize("ภาษาไทย")  # loads the word dictionary in advance
+        _READY_SEGMENTERS[language] = self.segmenter_cache_folder_path
+        logging.info(
+            f"Setting up word segmenter for language '{language}': done in {perf_counter() - start:.2f} seconds"
+        )
 
     def _create_spacy_tokenizer(self, language: AnyStr) -> Language:
         """Private method to create a custom spaCy tokenizer for a given language
+        If a snapshot cache is configured, the tokenizer is loaded from its snapshot when available,
+        else it is built from scratch and its snapshot is saved for the next runs.
         Args:
             language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
         Returns:
@@ -262,51 +607,35 @@ class MultilingualTokenizer:
         start = perf_counter()
         logging.info(f"Loading tokenizer for language '{language}'...")
         try:
-            if (
-                language == "th"
-            ):  # PyThaiNLP requires a "data directory" even if nothing needs to be downloaded
-                os.environ["PYTHAINLP_DATA_DIR"] = mkdtemp()  # dummy temp directory
-            if language in SPACY_LANGUAGE_MODELS and self.use_models:
-                nlp = spacy.load(SPACY_LANGUAGE_MODELS[language])
-            # Since v3, spaCy uses char tokenization by default for Chinese, not jieba anymore
-            # See https://github.com/explosion/spaCy/blob/e1f88de729f113f068958c824cf01026363bb110/spacy/lang/zh/__init__.py
-            # If a model is selected, jieba is not needed - see https://github.com/explosion/spaCy/discussions/8577#discussioncomment-955726
-            elif language == "zh":
-                nlp = Chinese.from_config({"nlp": {"tokenizer": {"segmenter": "jieba"}}})
-            else:
-                nlp = spacy.blank(
-                    language
-                )  # spaCy language without models (https://spacy.io/usage/models)
+            if language in self.SEGMENTER_LANGUAGES:
+                self._setup_segmenter(language)
+            nlp = None
+            if self._snapshot_cache:
+                snapshot_key = self._get_snapshot_key(language)
+                nlp = self._snapshot_cache.load(language, snapshot_key)
+            if nlp is None:
+                nlp = self._build_spacy_tokenizer(language)
+                if self._snapshot_cache:
+                    self._snapshot_cache.save(nlp, language, snapshot_key)
             nlp.max_length = self.max_num_characters
-            for component in self.add_pipe_components:
-                nlp.add_pipe(
-                    component,
-                    config=self.config[component] if component in self.config else {},
-                )
-            # if self.config is None, uses SpaCy default config, describing the default values of the factory arguments
-            if not self.use_models:
-                nlp.initialize()
             if self.enable_pipe_components:
                 self._restore_pipe_components[language] = nlp.select_pipes(
                     enable=self.enable_pipe_components
                 )
             if self.disable_pipe_components:
+                # Components excluded from pre-trained models, or missing from blank pipelines, cannot be disabled
+                disable_pipe_components = self.disable_pipe_components
+                if isinstance(disable_pipe_components, str):
+                    disable_pipe_components = [disable_pipe_components]
                 self._restore_pipe_components[language] = nlp.select_pipes(
-                    disable=self.disable_pipe_components
+                    disable=[component for component in disable_pipe_components if component in nlp.component_names]
                 )
 
         except (ValueError, OSError) as e:
             raise TokenizationError(
                 f"SpaCy tokenization not available for language '{language}' because of error: '{e}'"
             )
-        if self.hashtags_as_token:
-            re_token_match = spacy.tokenizer._get_regex_pattern(nlp.Defaults.token_match)
-            re_token_match = r"""({re_token_match}|#\w+)"""
-            nlp.tokenizer.token_match = re.compile(re_token_match).match
-            _prefixes = list(nlp.Defaults.prefixes)
-            if "#" in _prefixes:
-                _prefixes.remove("#")
-                nlp.tokenizer.prefix_search = spacy.util.compile_prefix_regex(_prefixes).search
+        # Stopword flags are stored in lexemes, which are not part of snapshots, so they are always customized
         if self.stopwords_folder_path and language in SUPPORTED_LANGUAGES_SPACY:
             self._customize_stopwords(nlp, language)
         logging.info(
@@ -358,12 +687,243 @@ class MultilingualTokenizer:
             raise TokenizationError("Missing language code")
         if language not in SUPPORTED_LANGUAGES_SPACY:
             raise TokenizationError(f"Unsupported language code: '{language}'")
-        if language not in self.spacy_nlp_dict:
-            self.spacy_nlp_dict[language] = self._create_spacy_tokenizer(language)
-            added_tokenizer = True
+        with self._lock:
+            if language not in self.spacy_nlp_dict:
+                self.spacy_nlp_dict[language] = self._create_spacy_tokenizer(language)
+                self._pipeline_states[language] = self._get_pipeline_state(self.spacy_nlp_dict[language])
+                if language in self._lemmatized_languages:
+                    self._activate_components_to_lemmatize(language)
+                added_tokenizer = True
+                self._evict_spacy_tokenizers()
+            else:
+                self.spacy_nlp_dict.move_to_end(language)  # mark as most recently used
 
         return added_tokenizer
 
+    def prewarm(self, languages: Iterable[AnyStr]) -> Future:
+        """Public method to add spaCy tokenizers for several languages in a background thread
+        This allows to overlap the creation of tokenizers with other work, for instance reading the input dataset.
+        Tokenization methods called meanwhile wait for the tokenizer of their language to be ready.
+        Args:
+            languages: Language codes in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Returns:
+            Future whose result is the list of languages whose tokenizer was added,
+            or which raises a TokenizationError if one of the tokenizers could not be created
+        """
+        languages = list(languages)
+        if self._prewarm_executor is None:
+            self._prewarm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tokenizer_prewarm")
+        logging.info(f"Loading tokenizers in the background for language(s): {languages}")
+        return self._prewarm_executor.submit(
+            lambda: [language for language in languages if self.add_spacy_tokenizer(language)]
+        )
+
+    @classmethod
+    def _estimate_pipeline_num_bytes(cls, nlp: Language) -> int:
+        """Private method to estimate the memory footprint of a spaCy Language without serializing it
+
+        The estimate is the sum of the weight arrays of all components, enabled or not, of the word vectors,
+        of the entries of lookups tables (e.g. lemmatization tables) and of the lexemes of the vocabulary,
+        which grows with the processed texts. Lookups entries and lexemes are counted with a fixed size.
+        """
+        num_bytes = len(nlp.vocab) * cls.NUM_BYTES_PER_LEXEME + nlp.vocab.vectors.data.nbytes
+        all_lookups = [nlp.vocab.lookups]
+        for _, component in nlp.components:
+            model = getattr(component, "model", None)
+            if hasattr(model, "walk"):
+                for node in model.walk():
+                    num_bytes += sum(
+                        node.get_param(name).nbytes for name in node.param_names if node.has_param(name)
+                    )
+            if getattr(component, "lookups", None) is not None:
+                all_lookups.append(component.lookups)
+        num_lookups_entries = sum(
+            len(lookups.get_table(table_name)) for lookups in all_lookups for table_name in lookups.tables
+        )
+        return num_bytes + num_lookups_entries * cls.NUM_BYTES_PER_LOOKUPS_ENTRY
+
+    def _evict_spacy_tokenizers(self) -> None:
+        """Private method to evict least recently used spaCy tokenizers from `spacy_nlp_dict`
+        until the number and estimated size of the remaining tokenizers are within the configured limits.
+        The most recently used tokenizer is never evicted. If a snapshot cache is configured,
+        evicted tokenizers are reloaded from their snapshot when needed again, and their lemmatization components
+        are activated again. Tokenizers changed in any other way after their creation cannot be rebuilt,
+        so they are never evicted. Sizes are estimated again each time, as vocabularies grow with processed texts.
+        """
+        pipelines_num_bytes = {}
+        if self.max_pipelines_num_bytes:
+            pipelines_num_bytes = {
+                language: self._estimate_pipeline_num_bytes(nlp) for language, nlp in self.spacy_nlp_dict.items()
+            }
+        evictable_languages = [
+            language
+            for language, nlp in list(self.spacy_nlp_dict.items())[:-1]
+            if self._get_pipeline_state(nlp) == self._pipeline_states.get(language)
+        ]
+        for language in evictable_languages:
+            if not (
+                (self.max_num_pipelines and len(self.spacy_nlp_dict) > self.max_num_pipelines)
+                or (
+                    self.max_pipelines_num_bytes
+                    and sum(pipelines_num_bytes.values()) > self.max_pipelines_num_bytes
+                )
+            ):
+                break
+            del self.spacy_nlp_dict[language]
+            self._restore_pipe_components.pop(language, None)
+            pipelines_num_bytes.pop(language, None)
+            self._pipeline_states.pop(language, None)
+            logging.info(f"Evicted least recently used tokenizer for language '{language}'")
+
+    def tokenize_iter(self, text_list: Iterable[AnyStr], language: AnyStr) -> Generator[Doc, None, None]:
+        """Public method to tokenize an iterable of strings for a given language, yielding documents in input order
+        Contrary to `tokenize_list`, texts are read and documents are yielded lazily, batch by batch,
+        so that memory usage is bounded by the batch size instead of the number of texts.
+        Args:
+            text_list: Iterable of strings, for instance a list, a pandas Series or a generator
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Yields:
+            Tokenized spaCy documents, one per input string
+        """
+        with self._lock:
+            self.add_spacy_tokenizer(language)
+            nlp = self.spacy_nlp_dict[language]
+        batch_stats = {"num_batches": 0, "num_documents": 0, "num_characters": 0}
+        text_iterator = self._iter_texts(text_list)
+        if self.sort_by_length:
+            yield from self._tokenize_length_buckets(nlp, text_iterator, language, batch_stats)
+        else:
+            yield from self._tokenize_batches(nlp, self._iter_batches(text_iterator, batch_stats), language)
+        if batch_stats["num_batches"]:
+            num_batches = batch_stats["num_batches"]
+            logging.info(
+                f"Tokenized {batch_stats['num_documents']} document(s) in language '{language}' "
+                + f"in {num_batches} batch(es) of {batch_stats['num_documents'] / num_batches:.0f} documents "
+                + f"and {batch_stats['num_characters'] / num_batches:.0f} characters on average, "
+                + f"with batch_size={self.batch_size}, max_batch_num_characters={self.max_batch_num_characters}, "
+                + f"sort_by_length={self.sort_by_length}"
+            )
+
+    def _iter_batches(
+        self, text_iterator: Iterator[AnyStr], batch_stats: Optional[dict] = None, num_batches: int = 1
+    ) -> Generator[List[AnyStr], None, None]:
+        """Private method to group texts into batches sized by `batch_size` or `max_batch_num_characters`
+        Args:
+            text_iterator: Iterator of strings
+            batch_stats: Optional dictionary where the number of batches, documents and characters are summed
+            num_batches: Number of batches to group in a single batch, to form windows of several batches
+        Yields:
+            Lists of strings, in input order
+        """
+        max_batch_size = self.batch_size * num_batches
+        max_num_characters = self.max_batch_num_characters * num_batches if self.max_batch_num_characters else None
+        batch = []
+        batch_num_characters = 0
+        text_iterator = iter(text_iterator)
+        while True:
+            text = next(text_iterator, None)  # None marks the end of texts, as missing values are already cleaned
+            if text is not None:
+                batch.append(text)
+                batch_num_characters += len(text) + 1
+            if max_num_characters:
+                is_full_batch = batch_num_characters >= max_num_characters
+            else:
+                is_full_batch = len(batch) >= max_batch_size
+            if batch and (is_full_batch or text is None):
+                if batch_stats is not None:
+                    batch_stats["num_batches"] += 1
+                    batch_stats["num_documents"] += len(batch)
+                    batch_stats["num_characters"] += batch_num_characters
+                yield batch
+                batch = []
+                batch_num_characters = 0
+            if text is None:
+                return
+
+    def _tokenize_batches(
+        self, nlp: Language, batch_iterator: Iterator[List[AnyStr]], language: AnyStr
+    ) -> Generator[Doc, None, None]:
+        """Private method to tokenize batches of strings, in the main process or with the pool of worker processes
+        Args:
+            nlp: spaCy Language instance of the main process for the given language
+            batch_iterator: Iterator of lists of strings
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Yields:
+            Tokenized spaCy documents, one per input string, in input order
+        """
+        if self._get_num_process() > 1:
+            yield from self._tokenize_iter_multiprocess(nlp, batch_iterator, language)
+        else:
+            for batch in batch_iterator:
+                yield from nlp.pipe(batch, batch_size=len(batch), n_process=self.DEFAULT_NUM_PROCESS)
+
+    def _tokenize_length_buckets(
+        self, nlp: Language, text_iterator: Iterator[AnyStr], language: AnyStr, batch_stats: dict
+    ) -> Generator[Doc, None, None]:
+        """Private method to tokenize strings in batches of similar lengths, yielding documents in input order
+        Texts are read by windows of LENGTH_BUCKETS_NUM_BATCHES batches. Each window is sorted by text length,
+        split into batches, tokenized, then documents are put back in input order before being yielded.
+        Args:
+            nlp: spaCy Language instance of the main process for the given language
+            text_iterator: Iterator of strings
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+            batch_stats: Dictionary where the number of batches, documents and characters are summed
+        Yields:
+            Tokenized spaCy documents, one per input string, in input order
+        """
+        for window in self._iter_batches(text_iterator, num_batches=self.LENGTH_BUCKETS_NUM_BATCHES):
+            length_order = np.argsort([len(text) for text in window], kind="stable")
+            sorted_texts = (window[position] for position in length_order)
+            sorted_docs = list(self._tokenize_batches(nlp, self._iter_batches(sorted_texts, batch_stats), language))
+            docs = [None] * len(window)
+            for position, doc in zip(length_order.tolist(), sorted_docs):
+                docs[position] = doc
+            yield from docs
+
+    @staticmethod
+    def _iter_texts(text_list: Iterable) -> Iterator[AnyStr]:
+        """Private method to iterate over texts, replacing missing values by empty strings
+        pandas Series and numpy arrays are cleaned in a vectorized way, without copying the strings themselves.
+        Arrow-backed string Series are only converted to Python strings lazily, one text at a time.
+        Args:
+            text_list: Iterable of texts, possibly with missing or non-string values
+        Returns:
+            Iterator of strings
+        """
+        if isinstance(text_list, np.ndarray):
+            text_list = pd.Series(text_list, copy=False)
+        if isinstance(text_list, pd.Series):
+            text_list = text_list.fillna("")
+            return iter(text_list if isinstance(text_list.dtype, pd.StringDtype) else text_list.astype(str))
+        return (str(t) if pd.notnull(t) else "" for t in text_list)
+
+    def tokenize_chunks_iter(
+        self, text_list: Iterable[AnyStr], language: AnyStr
+    ) -> Generator[Tuple[int, Doc], None, None]:
+        """Public method to tokenize an iterable of strings for a given language, splitting long texts into chunks
+        Texts longer than `max_chunk_num_characters` (or `max_num_characters` if lower) are split at sentence
+        or whitespace boundaries, and their chunks are streamed through the pipeline as separate documents.
+        Contrary to `tokenize_iter`, texts of any length can be tokenized with bounded memory usage,
+        which suits use cases where documents do not need to be kept whole, for instance counting tokens.
+        Args:
+            text_list: Iterable of strings, for instance a list, a pandas Series or a generator
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Yields:
+            Tuples (position of the original text in the input, tokenized spaCy document of a chunk),
+            in input order
+        """
+        max_num_characters = min(self.max_chunk_num_characters, self.max_num_characters)
+        chunk_text_positions = deque()  # filled by the chunk generator as the pipeline reads ahead
+
+        def iter_chunks() -> Iterator[AnyStr]:
+            for position, text in enumerate(self._iter_texts(text_list)):
+                for chunk in split_text(text, max_num_characters):
+                    chunk_text_positions.append(position)
+                    yield chunk
+
+        for doc in self.tokenize_iter(iter_chunks(), language):
+            yield (chunk_text_positions.popleft(), doc)
+
     def tokenize_list(self, text_list: List[AnyStr], language: AnyStr) -> List[Doc]:
         """Public method to tokenize a list of strings for a given language
         This method calls `_add_spacy_tokenizer` in case the requested language has not already been added.
@@ -376,25 +936,53 @@ class MultilingualTokenizer:
         """
         start = perf_counter()
         logging.info(f"Tokenizing {len(text_list)} document(s) in language '{language}'...")
-        text_list = [str(t) if pd.notnull(t) else "" for t in text_list]
         try:
-            self.add_spacy_tokenizer(language)
-            tokenized = list(
-                self.spacy_nlp_dict[language].pipe(
-                    text_list,
-                    batch_size=self.batch_size,
-                    n_process=self.DEFAULT_NUM_PROCESS,
-                )
-            )
+            tokenized = list(self.tokenize_iter(text_list, language))
             logging.info(
                 f"Tokenizing {len(tokenized)} document(s) in language '{language}': done in {perf_counter() - start:.2f} seconds"
             )
         except TokenizationError as e:
             raise TokenizationError(
-                f"Tokenization error: {e} for document(s): '{truncate_text_list(text_list)}'"
+                f"Tokenization error: {e} for document(s): '{truncate_text_list(list(self._iter_texts(text_list)))}'"
             )
         return tokenized
 
+    def _tokenize_iter_multiprocess(
+        self, nlp: Language, batch_iterator: Iterator[List[AnyStr]], language: AnyStr
+    ) -> Generator[Doc, None, None]:
+        """Private method to tokenize strings for a given language with the pool of worker processes
+
+        Each worker tokenizes one batch of texts at a time and sends it back as DocBin bytes,
+        which are deserialized with the vocabulary of the spaCy Language of the main process, in input order.
+        At most 2 batches per process are in flight at once, to bound memory usage.
+        If all texts fit in a single batch, they are tokenized in the main process to avoid any overhead.
+        Args:
+            nlp: spaCy Language instance of the main process for the given language
+            batch_iterator: Iterator of lists of strings, see `_iter_batches`
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+        Yields:
+            Tokenized spaCy documents, one per input string
+        """
+        first_batch = next(batch_iterator, [])
+        second_batch = next(batch_iterator, [])
+        if not second_batch:
+            yield from nlp.pipe(first_batch, batch_size=len(first_batch) or 1)
+            return
+        if self._get_pipeline_state(nlp) != self._pipeline_states.get(language):
+            raise TokenizationError(
+                f"Pipeline for language '{language}' was changed after its creation, "
+                "so it cannot be used by worker processes. Please set n_process to 1"
+            )
+        process_pool = self._get_process_pool()
+        max_pending_batches = 2 * self._get_num_process()
+        pending_results = deque()
+        for batch in chain([first_batch, second_batch], batch_iterator):
+            pending_results.append(process_pool.apply_async(_tokenize_batch_in_worker, (batch, language)))
+            if len(pending_results) >= max_pending_batches:
+                yield from DocBin().from_bytes(pending_results.popleft().get()).get_docs(nlp.vocab)
+        while pending_results:
+            yield from DocBin().from_bytes(pending_results.popleft().get()).get_docs(nlp.vocab)
+
     def tokenize_df(
         self,
         df: pd.DataFrame,
@@ -414,27 +1002,49 @@ class MultilingualTokenizer:
             DataFrame with all columns from the input, plus a new column with tokenized spaCy documents
         """
         self.tokenized_column = generate_unique("tokenized", df.keys(), text_column)
-        # Initialize the tokenized column to empty documents
-        df[self.tokenized_column] = pd.Series([Doc(Vocab())] * len(df.index), dtype="object")
         if language == "language_column":
-            languages = df[language_column].dropna().unique()
+            # Group rows once by factorized language codes, missing languages being coded as -1
+            language_codes, languages = pd.factorize(df[language_column])
             unsupported_languages = set(languages) - set(SUPPORTED_LANGUAGES_SPACY.keys())
             if unsupported_languages:
                 raise TokenizationError(
                     f"Found {len(unsupported_languages)} unsupported languages in input dataset: {unsupported_languages}"
                 )
-            for lang in languages:  # iterate over languages
-                language_indices = df[language_column] == lang
-                text_slice = df.loc[language_indices, text_column]  # slicing input df by language
-                if len(text_slice) != 0:
-                    tokenized_list = self.tokenize_list(text_list=text_slice, language=lang)
-
-                    df.loc[language_indices, self.tokenized_column] = pd.Series(
-                        tokenized_list,
-                        dtype="object",
-                        index=text_slice.index,  # keep index (important)
-                    )
+            sorted_positions = np.argsort(language_codes, kind="stable")
+            sorted_texts = df[text_column].to_numpy()[sorted_positions]
+            language_boundaries = np.cumsum(np.bincount(language_codes + 1, minlength=len(languages) + 1))
+            # Rows without language come first in the sort order and are left as empty documents
+            tokenized_sorted = [Doc(Vocab())] * int(language_boundaries[0])
+            for i, lang in enumerate(languages):  # tokenize contiguous slices of texts, one per language
+                text_slice = sorted_texts[language_boundaries[i] : language_boundaries[i + 1]]
+                tokenized_sorted.extend(self.tokenize_list(text_list=text_slice, language=lang))
+            # Scatter tokenized documents back to their original row positions with a single take
+            original_positions = np.empty_like(sorted_positions)
+            original_positions[sorted_positions] = np.arange(len(sorted_positions))
+            df[self.tokenized_column] = pd.Series(tokenized_sorted, dtype="object").take(original_positions).to_numpy()
         else:
             tokenized_list = self.tokenize_list(text_list=df[text_column], language=language)
             df[self.tokenized_column] = tokenized_list
         return df
+
+    def tokenize_df_chunks(
+        self,
+        df_iterator: Iterable[pd.DataFrame],
+        text_column: AnyStr,
+        language_column: AnyStr = "",
+        language: AnyStr = "language_column",
+    ) -> Generator[pd.DataFrame, None, None]:
+        """Public method to tokenize a text column in an iterable of pandas DataFrames, one chunk at a time
+        Each chunk is tokenized with `tokenize_df` and yielded before the next one is read,
+        so that memory usage is bounded by the chunk size instead of the dataset size.
+        Args:
+            df_iterator: Iterable of pandas DataFrames, for instance from `dataiku.Dataset.iter_dataframes`
+            text_column: Name of the column containing text data
+            language_column: Name of the column with language codes in ISO 639-1 format
+            language: Language code in ISO 639-1 format, cf. https://spacy.io/usage/models#languages
+                if equal to "language_column" this parameter is ignored in favor of language_column
+        Yields:
+            DataFrame chunks with all columns from the input, plus a new column with tokenized spaCy documents
+        """
+        for df in df_iterator:
+            yield self.tokenize_df(df, text_column=text_column, language_column=language_column, language=language)
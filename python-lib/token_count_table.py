@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""Module with a class to store token counts by subchart as a sparse matrix"""
+
+from typing import List, AnyStr, Dict, Iterable, Tuple
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from spacy.strings import hash_string
+
+
+class TokenCountTable:
+    """Sparse table of token counts with one row per subchart and one column per token of a shared vocabulary
+
+    Columns are identified by spaCy hash ids, which only depend on the token string, so that the vocabulary
+    can be shared across languages. Token strings are only stored for tokens which have been counted.
+    Each non-zero count keeps the sequence number of its first occurrence, so that tokens of a row can be
+    listed in order of first occurrence, which determines the tie-breaking order of wordcloud layouts.
+
+    If `max_num_tokens_per_row` is set, counts are approximate heavy hitters computed with the Space-Saving
+    algorithm. Each row only keeps its `max_num_tokens_per_row` highest counts. A token added to a full row
+    inherits the minimum count of the row, so that counts are never underestimated, and overestimated by at most
+    `get_error_bounds`. Columns of tokens dropped from all rows are removed when buffered counts are merged,
+    so that memory usage is bounded by `max_num_tokens_per_row` per row plus the buffered counts,
+    whatever the number of distinct tokens. Columns returned by `get_column` are then renumbered.
+    If `case_insensitive` is set, rows keep the highest counts of groups of case versions of a token instead,
+    so that counts summed by `fold_case` are also never underestimated, and overestimated by at most
+    `get_error_bounds`. Rows then keep all case versions of their `max_num_tokens_per_row` groups.
+
+    Attributes:
+        subcharts (list): Row labels, one per subchart
+        tokens (list): Column labels, one token string per column in order of first occurrence
+        num_compactions (int): Number of times columns were removed and renumbered, in approximate mode only
+        token_ids (list): spaCy hash id of each column token
+        lower_token_ids (list): spaCy hash id of the lowercase form of each column token
+        max_num_tokens_per_row (int): Maximum number of counts kept per row, None for exact counting
+        case_insensitive (bool): Whether counts are kept per row by group of case versions in approximate mode
+        dtype (numpy.dtype): Type of counts, floating point for weighted counts
+    """
+
+    MAX_NUM_PENDING_COUNTS = 10 ** 6
+    """int: Maximum number of counts to buffer before merging them into the sparse matrix"""
+
+    def __init__(
+        self,
+        subcharts: Iterable = ("",),
+        max_num_tokens_per_row: int = None,
+        dtype: type = np.int64,
+        case_insensitive: bool = False,
+    ):
+        """Initialization method for the TokenCountTable class
+
+        Args:
+            subcharts: Row labels, one per subchart. Default is a single unnamed row.
+            max_num_tokens_per_row: Maximum number of counts kept per row. Default is None for exact counting.
+            dtype: Type of counts. Default is 64-bit integers.
+            case_insensitive: Whether counts are kept per row by group of case versions in approximate mode,
+                for tables whose case is folded by `fold_case`. Default is False.
+        """
+        self.subcharts = list(subcharts)
+        self.dtype = np.dtype(dtype)
+        self._rows = {subchart: row for row, subchart in enumerate(self.subcharts)}
+        self.max_num_tokens_per_row = max_num_tokens_per_row
+        self.case_insensitive = case_insensitive
+        self.tokens = []
+        self.token_ids = []
+        self.lower_token_ids = []
+        self._columns = {}  # spaCy hash id (key) and column (value)
+        self.num_compactions = 0
+        self._matrix = csr_matrix((len(self.subcharts), 0), dtype=self.dtype)
+        self._first_occurrences = np.zeros(0, dtype=np.int64)  # aligned with self._matrix.data
+        self._pending_counts = []  # list of (row codes, column codes, counts, first occurrences) arrays
+        self._num_pending_counts = 0
+        self._num_occurrences = 0  # sequence number of the next count
+        self._row_min_counts = np.zeros(len(self.subcharts), dtype=self.dtype)  # inherited by new tokens of full rows
+        self._row_merged_error_bounds = np.zeros(len(self.subcharts), dtype=self.dtype)  # from merged tables
+
+    def __len__(self) -> int:
+        """Return the number of non-empty rows"""
+        return int(np.count_nonzero(self.matrix.getnnz(axis=1)))
+
+    def get_rows(self, subcharts: Iterable) -> np.ndarray:
+        """Return the rows of subcharts, adding new rows at the end of the table if needed
+
+        Rows are stable, so that counts of successive chunks of data can be added to the same table.
+
+        Args:
+            subcharts: Row labels
+
+        Returns:
+            Array with the row of each subchart in the table
+        """
+        num_rows = len(self.subcharts)
+        for subchart in subcharts:
+            if subchart not in self._rows:
+                self._rows[subchart] = len(self.subcharts)
+                self.subcharts.append(subchart)
+        num_new_rows = len(self.subcharts) - num_rows
+        if num_new_rows:
+            self._matrix.resize((len(self.subcharts), self._matrix.shape[1]))
+            self._row_min_counts = np.concatenate([self._row_min_counts, np.zeros(num_new_rows, dtype=self.dtype)])
+            self._row_merged_error_bounds = np.concatenate(
+                [self._row_merged_error_bounds, np.zeros(num_new_rows, dtype=self.dtype)]
+            )
+        return np.array([self._rows[subchart] for subchart in subcharts], dtype=np.int64)
+
+    def sort_rows(self) -> None:
+        """Sort rows by subchart label, in place"""
+        row_order = sorted(range(len(self.subcharts)), key=self.subcharts.__getitem__)
+        new_rows = np.empty(len(row_order), dtype=np.int64)
+        new_rows[row_order] = np.arange(len(row_order))
+        matrix = self.matrix.tocoo()
+        # Stable sort by new row keeps columns sorted within each row, hence data in canonical CSR order
+        data_order = np.argsort(new_rows[matrix.row], kind="stable")
+        self._matrix = csr_matrix(
+            (matrix.data[data_order], (new_rows[matrix.row[data_order]], matrix.col[data_order])), shape=matrix.shape
+        )
+        self._first_occurrences = self._first_occurrences[data_order]
+        self._row_min_counts = self._row_min_counts[row_order]
+        self._row_merged_error_bounds = self._row_merged_error_bounds[row_order]
+        self.subcharts = [self.subcharts[row] for row in row_order]
+        self._rows = {subchart: row for row, subchart in enumerate(self.subcharts)}
+
+    def get_column(self, token_id: int, token: AnyStr, lower_token_id: int = None) -> int:
+        """Return the column of a token, adding it to the vocabulary if needed
+
+        Args:
+            token_id: spaCy hash id of the token string
+            token: Token string
+            lower_token_id: spaCy hash id of the lowercase token string, computed from the token if not provided
+
+        Returns:
+            Column of the token in the table, valid until `num_compactions` changes
+        """
+        column = self._columns.get(token_id)
+        if column is None:
+            column = len(self.tokens)
+            self._columns[token_id] = column
+            self.tokens.append(token)
+            self.token_ids.append(token_id)
+            self.lower_token_ids.append(lower_token_id if lower_token_id is not None else hash_string(token.lower()))
+        return column
+
+    def add_counts(self, row_codes: np.ndarray, columns: np.ndarray, counts: np.ndarray) -> None:
+        """Add counts to the table, in order of occurrence
+
+        Args:
+            row_codes: Array of rows, one per count
+            columns: Array of columns, one per count, as returned by `get_column`
+            counts: Array of counts to add
+        """
+        num_counts = len(counts)
+        if not num_counts:
+            return
+        first_occurrences = np.arange(self._num_occurrences, self._num_occurrences + num_counts, dtype=np.int64)
+        self._num_occurrences += num_counts
+        self._pending_counts.append(
+            (
+                np.asarray(row_codes, dtype=np.int64),
+                np.asarray(columns, dtype=np.int64),
+                np.asarray(counts, dtype=self.dtype),
+                first_occurrences,
+            )
+        )
+        self._num_pending_counts += num_counts
+        if self._num_pending_counts > max(self.MAX_NUM_PENDING_COUNTS, self._matrix.nnz):
+            self._merge_pending_counts()
+
+    def _merge_pending_counts(self) -> None:
+        """Private method to merge buffered counts into the sparse matrix in a single vectorized pass
+
+        Counts of duplicate (row, column) pairs are summed and their earliest first occurrence is kept.
+        In approximate mode, rows are then truncated to their highest counts, see `_truncate_rows`.
+        """
+        num_columns = len(self.tokens)
+        if not self._pending_counts and self._matrix.shape[1] == num_columns:
+            return
+        matrix = self._matrix.tocoo()
+        row_codes, columns, counts, first_occurrences = [
+            np.concatenate([array] + [pending[i] for pending in self._pending_counts])
+            for i, array in enumerate([matrix.row, matrix.col, matrix.data, self._first_occurrences])
+        ]
+        keys = row_codes.astype(np.int64) * num_columns + columns
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        summed_counts = np.zeros(len(unique_keys), dtype=self._matrix.dtype)
+        np.add.at(summed_counts, inverse, counts)
+        earliest_first_occurrences = np.full(len(unique_keys), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(earliest_first_occurrences, inverse, first_occurrences)
+        if self.max_num_tokens_per_row:
+            is_monitored = np.zeros(len(unique_keys), dtype=bool)
+            is_monitored[inverse[: matrix.nnz]] = True
+            unique_keys, summed_counts, earliest_first_occurrences = self._truncate_rows(
+                unique_keys, summed_counts, earliest_first_occurrences, is_monitored
+            )
+            unique_keys, num_columns = self._compact_columns(unique_keys)
+        # Unique keys are sorted by row then column, hence data is in canonical CSR order
+        self._matrix = csr_matrix(
+            (summed_counts, (unique_keys // max(num_columns, 1), unique_keys % max(num_columns, 1))),
+            shape=(len(self.subcharts), num_columns),
+        )
+        self._first_occurrences = earliest_first_occurrences
+        self._pending_counts = []
+        self._num_pending_counts = 0
+
+    def _truncate_rows(
+        self, keys: np.ndarray, counts: np.ndarray, first_occurrences: np.ndarray, is_monitored: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Private method to apply a batched Space-Saving update to merged counts, for all rows at once
+
+        Tokens which were not monitored in a full row inherit the minimum count of the row.
+        Each row then keeps its `max_num_tokens_per_row` highest counts, with ties broken by first occurrence,
+        and its minimum count is updated. If `case_insensitive` is set, the monitored items are groups of
+        case versions of a token with summed counts, and the inherited count goes to the first version of a group.
+
+        Args:
+            keys: Sorted array of (row, column) keys
+            counts: Array of summed counts, aligned with keys
+            first_occurrences: Array of first occurrences, aligned with keys
+            is_monitored: Boolean array, True if the key was already counted before the update
+
+        Returns:
+            Tuple of arrays (keys, counts, first occurrences) truncated, in the same sorted order
+        """
+        num_columns = max(len(self.tokens), 1)
+        rows = keys // num_columns
+        if self.case_insensitive:
+            _, column_groups = np.unique(np.array(self.lower_token_ids, dtype=np.uint64), return_inverse=True)
+            column_groups = column_groups.ravel()
+            group_keys = rows * (int(column_groups.max(initial=0)) + 1) + column_groups[keys % num_columns]
+        else:
+            group_keys = keys
+        unique_group_keys, group_positions = np.unique(group_keys, return_inverse=True)
+        group_positions = group_positions.ravel()
+        num_groups = len(unique_group_keys)
+        group_rows = np.zeros(num_groups, dtype=np.int64)
+        group_rows[group_positions] = rows
+        group_first_occurrences = np.full(num_groups, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(group_first_occurrences, group_positions, first_occurrences)
+        group_is_monitored = np.zeros(num_groups, dtype=bool)
+        group_is_monitored[group_positions[is_monitored]] = True
+        inherited_counts = np.where(group_is_monitored, 0, self._row_min_counts[group_rows]).astype(self.dtype)
+        # First occurrences are unique, so that each new group inherits the minimum count once
+        is_first_of_group = first_occurrences == group_first_occurrences[group_positions]
+        counts = counts + np.where(is_first_of_group, inherited_counts[group_positions], 0).astype(self.dtype)
+        group_counts = np.zeros(num_groups, dtype=self.dtype)
+        np.add.at(group_counts, group_positions, counts)
+        order = np.lexsort((group_first_occurrences, -group_counts, group_rows))
+        sorted_rows = group_rows[order]
+        row_starts = np.searchsorted(sorted_rows, sorted_rows, side="left")
+        is_kept_group = np.zeros(num_groups, dtype=bool)
+        is_kept_group[order[np.arange(num_groups) - row_starts < self.max_num_tokens_per_row]] = True
+        kept_positions = np.flatnonzero(is_kept_group[group_positions])
+        keys, counts, first_occurrences = (
+            keys[kept_positions],
+            counts[kept_positions],
+            first_occurrences[kept_positions],
+        )
+        group_rows, group_counts = group_rows[is_kept_group], group_counts[is_kept_group]
+        row_num_groups = np.bincount(group_rows, minlength=len(self.subcharts))
+        row_min_counts = np.full(len(self.subcharts), group_counts.max(initial=0), dtype=self.dtype)
+        np.minimum.at(row_min_counts, group_rows, group_counts)
+        self._row_min_counts = np.where(row_num_groups >= self.max_num_tokens_per_row, row_min_counts, 0)
+        return (keys, counts, first_occurrences)
+
+    def _compact_columns(self, keys: np.ndarray) -> Tuple[np.ndarray, int]:
+        """Private method to remove the columns of tokens which are not counted in any row, and renumber the others
+
+        Remaining columns keep their order of first occurrence, so that sorted keys remain sorted.
+
+        Args:
+            keys: Sorted array of (row, column) keys
+
+        Returns:
+            Tuple with the array of keys of the renumbered columns and the new number of columns
+        """
+        num_columns = max(len(self.tokens), 1)
+        rows, columns = keys // num_columns, keys % num_columns
+        kept_columns = np.unique(columns)
+        if len(kept_columns) == len(self.tokens):
+            return (keys, len(self.tokens))
+        new_columns = np.full(num_columns, -1, dtype=np.int64)
+        new_columns[kept_columns] = np.arange(len(kept_columns))
+        kept_columns = kept_columns.tolist()
+        self.tokens = [self.tokens[column] for column in kept_columns]
+        self.token_ids = [self.token_ids[column] for column in kept_columns]
+        self.lower_token_ids = [self.lower_token_ids[column] for column in kept_columns]
+        self._columns = {token_id: column for column, token_id in enumerate(self.token_ids)}
+        self.num_compactions += 1
+        return (rows * max(len(kept_columns), 1) + new_columns[columns], len(kept_columns))
+
+    def get_error_bounds(self) -> np.ndarray:
+        """Return the maximum overestimation of counts in each row, always 0 for exact counting
+
+        Any token which is not in a row has a true count lower or equal to the bound of the row.
+        """
+        self._merge_pending_counts()
+        return self._row_min_counts + self._row_merged_error_bounds
+
+    @property
+    def matrix(self) -> csr_matrix:
+        """scipy.sparse.csr_matrix: Token counts with one row per subchart and one column per token"""
+        self._merge_pending_counts()
+        return self._matrix
+
+    def merge(self, other: "TokenCountTable") -> "TokenCountTable":
+        """Add the counts of another table to this one, matching rows by subchart and columns by token
+
+        Args:
+            other: Table whose counts are added. Its counts occur after the counts of this table.
+                Its error bounds are added to the error bounds of this table.
+
+        Returns:
+            This table, for chaining
+        """
+        row_mapping = self.get_rows(other.subcharts)
+        np.add.at(self._row_merged_error_bounds, row_mapping, other.get_error_bounds())
+        column_mapping = np.array(
+            [
+                self.get_column(token_id, token, lower_token_id)
+                for token_id, token, lower_token_id in zip(other.token_ids, other.tokens, other.lower_token_ids)
+            ],
+            dtype=np.int64,
+        )
+        other_matrix = other.matrix.tocoo()
+        occurrence_order = np.argsort(other._first_occurrences, kind="stable")
+        self.add_counts(
+            row_mapping[other_matrix.row[occurrence_order]],
+            column_mapping[other_matrix.col[occurrence_order]],
+            other_matrix.data[occurrence_order],
+        )
+        return self
+
+    def fold_case(self) -> "TokenCountTable":
+        """Return a new table where the counts of all case versions of a token are summed e.g., "The" and "the"
+
+        In each row, the case version with the highest count represents the whole group.
+        In case of a tie, the lowercase version is chosen, then the version which occurred first.
+        Groups are identified by the hash ids of lowercase tokens, and the representative of each group
+        is selected for all rows at once with a single vectorized sort.
+        Tokens of each row are ordered alphabetically by lowercase form in the new table.
+
+        Returns:
+            New table with a single case version for each token and the sum of counts across case versions
+        """
+        folded_counts = TokenCountTable(self.subcharts, dtype=self.dtype)
+        matrix = self.matrix.tocoo()  # data is in canonical order, aligned with first occurrences
+        if not matrix.nnz:
+            return folded_counts
+        unique_lower_token_ids, first_columns, column_groups = np.unique(
+            np.array(self.lower_token_ids, dtype=np.uint64), return_index=True, return_inverse=True
+        )
+        group_ranks = np.empty(len(unique_lower_token_ids), dtype=np.int64)
+        # Sorted as Python strings, as a numpy string array would be as wide as the longest token for every token
+        lower_tokens = [self.tokens[column].lower() for column in first_columns.tolist()]
+        group_ranks[sorted(range(len(lower_tokens)), key=lower_tokens.__getitem__)] = np.arange(len(lower_tokens))
+        column_is_lowercase = np.array(self.token_ids, dtype=np.uint64) == np.array(
+            self.lower_token_ids, dtype=np.uint64
+        )
+        keys = matrix.row.astype(np.int64) * len(unique_lower_token_ids) + group_ranks[column_groups[matrix.col]]
+        order = np.lexsort((self._first_occurrences, ~column_is_lowercase[matrix.col], -matrix.data, keys))
+        sorted_keys = keys[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        group_counts = np.add.reduceat(matrix.data[order], group_starts)
+        representatives = order[group_starts]  # sorted by row then rank of the lowercase form
+        folded_columns = np.array(
+            [
+                folded_counts.get_column(self.token_ids[column], self.tokens[column], self.lower_token_ids[column])
+                for column in matrix.col[representatives].tolist()
+            ],
+            dtype=np.int64,
+        )
+        folded_counts.add_counts(matrix.row[representatives], folded_columns, group_counts)
+        return folded_counts
+
+    def totals(self) -> np.ndarray:
+        """Return the total count of each token across all subcharts, aligned with the `tokens` attribute"""
+        return np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def get_row_counts(self, row: int, max_words: int = None) -> Dict[AnyStr, int]:
+        """Return the token counts of a row, ordered by first occurrence
+
+        Args:
+            row: Row of the subchart in the table
+            max_words: If set, only keep the tokens with the highest counts, with ties broken by first occurrence
+
+        Returns:
+            Dictionary with tokens (key) and counts (value)
+        """
+        matrix = self.matrix
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        columns, counts, first_occurrences = (
+            matrix.indices[start:end],
+            matrix.data[start:end],
+            self._first_occurrences[start:end],
+        )
+        if max_words and max_words < len(counts):
+            top_positions = np.lexsort((first_occurrences, -counts))[:max_words]
+            columns, counts, first_occurrences = (
+                columns[top_positions],
+                counts[top_positions],
+                first_occurrences[top_positions],
+            )
+        occurrence_order = np.argsort(first_occurrences, kind="stable")
+        return {
+            self.tokens[column]: count
+            for column, count in zip(columns[occurrence_order], counts[occurrence_order].tolist())
+        }
+
+    def items(self, max_words: int = None) -> Iterable[Tuple[AnyStr, Dict[AnyStr, int]]]:
+        """Yield a tuple (subchart, token counts) for each non-empty row, see `get_row_counts`"""
+        row_num_tokens = self.matrix.getnnz(axis=1)
+        for row, subchart in enumerate(self.subcharts):
+            if row_num_tokens[row]:
+                yield (subchart, self.get_row_counts(row, max_words))
+
+    def to_list(self) -> List[Tuple[AnyStr, Counter]]:
+        """Return a list of tuples (subchart, counter) for each non-empty row"""
+        return [(subchart, Counter(counts)) for subchart, counts in self.items()]
+
+    @classmethod
+    def from_counters(cls, subcharts: Iterable, counters: List[Counter]) -> "TokenCountTable":
+        """Create a table from one token counter per subchart, each ordered by first occurrence
+
+        Args:
+            subcharts: Row labels, one per subchart
+            counters: Token counters, one per subchart
+
+        Returns:
+            New table with the counts
+        """
+        table = cls(subcharts)
+        for row, counter in enumerate(counters):
+            columns = [table.get_column(hash_string(token), token) for token in counter.keys()]
+            table.add_counts(
+                np.full(len(columns), row), np.array(columns, dtype=np.int64), np.array(list(counter.values()))
+            )
+        return table
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Module with utility functions which are *not* based on the Dataiku API"""
 
+import os
 import logging
 import functools
 from typing import Callable, AnyStr
@@ -23,3 +24,28 @@ def time_logging(log_message: AnyStr):
         return wrapper
 
     return inner_function
+
+
+def get_num_available_cpus() -> int:
+    """Return the number of CPUs available to this process
+
+    Contrary to `os.cpu_count`, which counts all CPUs of the machine, this takes into account the CPUs this process
+    may run on, and the CPU quota of its cgroup (v2 or v1), for instance when running in a container.
+    """
+    num_cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    for quota_path, period_path in [
+        ("/sys/fs/cgroup/cpu.max", None),
+        ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us"),
+    ]:
+        try:
+            with open(quota_path) as quota_file:
+                quota = quota_file.read().split()
+            if period_path:
+                with open(period_path) as period_file:
+                    quota.append(period_file.read().strip())
+            if quota[0] not in {"max", "-1"}:
+                num_cpus = min(num_cpus, max(1, int(quota[0]) // int(quota[1])))
+            break
+        except (OSError, ValueError, IndexError):
+            continue
+    return max(1, num_cpus)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""Module with an alternative layout engine for wordclouds, placing words along a spiral over a bitmap"""
+
+from operator import itemgetter
+from random import Random
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+from wordcloud import WordCloud
+
+from font_cache import get_font, CachedTransposedFont
+
+
+class BitmapOccupancyIndex:
+    """Index of the occupied pixels of a canvas, to find free positions of a box with vectorized tests
+
+    Free positions are searched first on a coarse index of blocks of pixels, which is much smaller:
+    a box fits wherever the blocks covering it are free, and does not fit if no position is free
+    for the blocks which it fully covers. The exact search on all pixels is only needed in between.
+
+    Attributes:
+        height (int): Height of the canvas in pixels
+        width (int): Width of the canvas in pixels
+        block_size (int, optional): Size in pixels of the square blocks of the coarse index, None for no coarse index
+    """
+
+    def __init__(self, height: int, width: int, mask: Optional[np.ndarray] = None, block_size: Optional[int] = None):
+        """Initialization method for the BitmapOccupancyIndex class
+
+        Args:
+            height: Height of the canvas in pixels
+            width: Width of the canvas in pixels
+            mask: Optional boolean array of shape (height, width), True where words must not be drawn
+            block_size: Size in pixels of the square blocks of the coarse index, None for no coarse index
+        """
+        self.height = height
+        self.width = width
+        self.block_size = block_size
+        padded_height, padded_width = height, width
+        if block_size:
+            padded_height, padded_width = -(-height // block_size) * block_size, -(-width // block_size) * block_size
+        # Padding pixels are occupied, so that coarse blocks overlapping the canvas border are never free
+        self._occupied = np.ones((padded_height, padded_width), dtype=bool)
+        self._occupied[:height, :width] = False if mask is None else mask.astype(bool)
+        self._integral = np.zeros((height + 1, width + 1), dtype=np.int32)
+        self._integral[1:, 1:] = np.cumsum(np.cumsum(self._occupied[:height, :width], axis=0, dtype=np.int32), axis=1)
+        distance_x = ((np.arange(height) + 0.5) / height - 0.5) ** 2
+        distance_y = ((np.arange(width) + 0.5) / width - 0.5) ** 2
+        # Distances to the center are scaled by the canvas size, to spread words in an ellipse of the same aspect ratio
+        self._center_distances = (distance_x[:, None] + distance_y[None, :]).astype(np.float32)
+        self._coarse_index = None
+        if block_size:
+            self._coarse_index = BitmapOccupancyIndex(
+                padded_height // block_size,
+                padded_width // block_size,
+                mask=self._get_blocks_occupancy(0, 0, padded_height // block_size, padded_width // block_size),
+            )
+
+    def _get_blocks_occupancy(self, top: int, left: int, bottom: int, right: int) -> np.ndarray:
+        """Return a boolean array, True for each block of a range of blocks where at least one pixel is occupied"""
+        block_size = self.block_size
+        pixels = self._occupied[top * block_size : bottom * block_size, left * block_size : right * block_size]
+        return pixels.reshape(bottom - top, block_size, right - left, block_size).any(axis=(1, 3))
+
+    def update(self, box_occupancy: np.ndarray, top: int, left: int) -> None:
+        """Update the index with the pixels of a box which became occupied, without recomputing all of it
+
+        Args:
+            box_occupancy: Array of the pixels of the box, non-zero where pixels are occupied.
+                Pixels outside of the box must not have changed.
+            top: Position of the top of the box in pixels
+            left: Position of the left of the box in pixels
+        """
+        bottom, right = top + box_occupancy.shape[0], left + box_occupancy.shape[1]
+        newly_occupied = (box_occupancy != 0) & ~self._occupied[top:bottom, left:right]
+        if not newly_occupied.any():
+            return
+        self._occupied[top:bottom, left:right] |= newly_occupied
+        box_integral = np.cumsum(np.cumsum(newly_occupied, axis=0, dtype=np.int32), axis=1)
+        # Pixels of the box are added to all sums of the integral image whose region includes them
+        self._integral[top + 1 : bottom + 1, left + 1 : right + 1] += box_integral
+        self._integral[bottom + 1 :, left + 1 : right + 1] += box_integral[-1]
+        self._integral[top + 1 : bottom + 1, right + 1 :] += box_integral[:, -1:]
+        self._integral[bottom + 1 :, right + 1 :] += box_integral[-1, -1]
+        if self._coarse_index is not None:
+            block_size = self.block_size
+            block_top, block_left = top // block_size, left // block_size
+            block_bottom, block_right = -(-bottom // block_size), -(-right // block_size)
+            self._coarse_index.update(
+                self._get_blocks_occupancy(block_top, block_left, block_bottom, block_right), block_top, block_left
+            )
+
+    def get_free_positions(self, size_x: int, size_y: int) -> Optional[np.ndarray]:
+        """Return a boolean array, True for each top-left position where a box of a given size is fully free
+
+        Args:
+            size_x: Size of the box along the first axis (height)
+            size_y: Size of the box along the second axis (width)
+
+        Returns:
+            Boolean array of shape (height - size_x + 1, width - size_y + 1), or None if the box is too large
+        """
+        if size_x > self.height or size_y > self.width:
+            return None
+        integral = self._integral
+        num_rows, num_columns = integral.shape[0] - size_x, integral.shape[1] - size_y
+        return (integral[size_x:, size_y:] + integral[:num_rows, :num_columns]) == (
+            integral[:num_rows, size_y:] + integral[size_x:, :num_columns]
+        )
+
+    def find_position(self, size_x: int, size_y: int) -> Optional[Tuple[int, int]]:
+        """Return the free top-left position of a box whose center is the closest to the center of the canvas
+
+        Args:
+            size_x: Size of the box along the first axis (height)
+            size_y: Size of the box along the second axis (width)
+
+        Returns:
+            Tuple (x, y) of the top-left position, or None if the box does not fit anywhere
+        """
+        if self._coarse_index is not None:
+            block_size = self.block_size
+            block_position = self._coarse_index.find_position(-(-size_x // block_size), -(-size_y // block_size))
+            if block_position is not None:
+                return (block_position[0] * block_size, block_position[1] * block_size)
+            # A box at (x, y) fully covers at least this number of blocks along each axis,
+            # starting from the block (ceil(x / block_size), ceil(y / block_size))
+            num_blocks_x, num_blocks_y = size_x // block_size - 1, size_y // block_size - 1
+            if num_blocks_x > 0 and num_blocks_y > 0:
+                free_blocks = self._coarse_index.get_free_positions(num_blocks_x, num_blocks_y)
+                if free_blocks is None or not free_blocks.any():
+                    return None
+                return self._find_position_in_blocks(size_x, size_y, free_blocks)
+        free_positions = self.get_free_positions(size_x, size_y)
+        if free_positions is None or not free_positions.any():
+            return None
+        distances = self._center_distances[
+            size_x // 2 : size_x // 2 + free_positions.shape[0], size_y // 2 : size_y // 2 + free_positions.shape[1]
+        ]
+        position = np.unravel_index(np.argmin(np.where(free_positions, distances, np.inf)), free_positions.shape)
+        return (int(position[0]), int(position[1]))
+
+    def _find_position_in_blocks(self, size_x: int, size_y: int, free_blocks: np.ndarray) -> Optional[Tuple[int, int]]:
+        """Return the free top-left position of a box closest to the center, only testing the positions
+        which start in the block before one of the free block positions of the coarse index"""
+        block_size = self.block_size
+        block_x, block_y = np.nonzero(free_blocks)
+        offsets = np.arange(1 - block_size, 1)
+        candidates_x = (block_x * block_size)[:, None, None] + offsets[None, :, None]
+        candidates_y = (block_y * block_size)[:, None, None] + offsets[None, None, :]
+        candidates_x, candidates_y = np.broadcast_arrays(candidates_x, candidates_y)
+        is_valid = (
+            (candidates_x >= 0)
+            & (candidates_x <= self.height - size_x)
+            & (candidates_y >= 0)
+            & (candidates_y <= self.width - size_y)
+        )
+        candidates_x, candidates_y = candidates_x[is_valid], candidates_y[is_valid]
+        integral = self._integral
+        is_free = (
+            integral[candidates_x + size_x, candidates_y + size_y] + integral[candidates_x, candidates_y]
+        ) == (integral[candidates_x, candidates_y + size_y] + integral[candidates_x + size_x, candidates_y])
+        if not is_free.any():
+            return None
+        candidates_x, candidates_y = candidates_x[is_free], candidates_y[is_free]
+        closest = np.argmin(self._center_distances[candidates_x + size_x // 2, candidates_y + size_y // 2])
+        return (int(candidates_x[closest]), int(candidates_y[closest]))
+
+
+class SpiralWordCloud(WordCloud):
+    """WordCloud placing each word at the free position closest to the center of the canvas
+
+    Contrary to the random search of WordCloud, all candidate positions of a word are tested at once on a bitmap
+    occupancy index with a coarse level, see `BitmapOccupancyIndex`, and font sizes are found by bisection
+    instead of being decreased one step at a time. The index is updated incrementally with the pixels of each word.
+    Words are thus laid out in a compact elliptic spiral. Layout is faster than the random search only on large
+    canvases where many words fit, e.g. about twice as fast at 1200x600: on small canvases, both engines stop
+    once the canvas is full, whatever `max_words`.
+    The layout is deterministic for a given `random_state`, which sets word orientations.
+    The resulting `layout_` has the same format as WordCloud, so `to_image` and `recolor` work as usual.
+    """
+
+    BLOCK_SIZE = 4
+    """int: Size in pixels of the square blocks of the coarse occupancy index"""
+
+    def _place_word(
+        self,
+        occupancy: BitmapOccupancyIndex,
+        word: str,
+        max_font_size: int,
+        orientations: Tuple,
+    ) -> Optional[Tuple[int, Optional[int], Tuple[int, int], CachedTransposedFont]]:
+        """Return the largest font size up to `max_font_size` at which a word fits, with its orientation,
+        position and font, or None if it does not fit even at `min_font_size`"""
+
+        def try_font_size(font_size: int):
+            for orientation in orientations:
+                transposed_font = CachedTransposedFont(get_font(self.font_path, font_size), orientation=orientation)
+                box_size = transposed_font.get_text_size(word)
+                position = occupancy.find_position(box_size[1] + self.margin, box_size[0] + self.margin)
+                if position is not None:
+                    return (font_size, orientation, position, transposed_font)
+            return None
+
+        placement = try_font_size(max_font_size)
+        if placement is not None:
+            return placement
+        lower, upper = self.min_font_size, max_font_size - 1
+        while lower <= upper:  # bisection on the font size, assuming smaller words fit wherever larger words fit
+            font_size = (lower + upper) // 2
+            result = try_font_size(font_size)
+            if result is not None:
+                placement = result
+                lower = font_size + 1
+            else:
+                upper = font_size - 1
+        return placement
+
+    def generate_from_frequencies(self, frequencies: Dict, max_font_size: Optional[int] = None):  # noqa: C901
+        """Create a wordcloud from words and frequencies, with the same parameters as WordCloud
+
+        Args:
+            frequencies: Dictionary of words (key) and frequencies (value)
+            max_font_size: Use this font size instead of `self.max_font_size`
+
+        Returns:
+            self
+        """
+        frequencies = sorted(frequencies.items(), key=itemgetter(1), reverse=True)
+        if len(frequencies) <= 0:
+            raise ValueError(f"We need at least 1 word to plot a word cloud, got {len(frequencies)}.")
+        frequencies = frequencies[: self.max_words]
+        max_frequency = float(frequencies[0][1])
+        frequencies = [(word, freq / max_frequency) for word, freq in frequencies]
+        random_state = self.random_state if isinstance(self.random_state, Random) else Random(self.random_state)
+        if self.mask is not None:
+            boolean_mask = self._get_bolean_mask(self.mask)
+            height, width = self.mask.shape[0], self.mask.shape[1]
+        else:
+            boolean_mask = None
+            height, width = self.height, self.width
+        occupancy = BitmapOccupancyIndex(height, width, boolean_mask, block_size=self.BLOCK_SIZE)
+        img_grey = Image.new("L", (width, height))
+        draw = ImageDraw.Draw(img_grey)
+
+        if max_font_size is None:
+            max_font_size = self.max_font_size
+        if max_font_size is None:
+            # Same heuristic as WordCloud: lay out the first two words to find a good font size
+            if len(frequencies) == 1:
+                font_size = self.height
+            else:
+                self.generate_from_frequencies(dict(frequencies[:2]), max_font_size=self.height)
+                sizes = [x[1] for x in self.layout_]
+                if not sizes:
+                    raise ValueError(
+                        "Couldn't find space to draw. Either the Canvas size is too small "
+                        "or too much of the image is masked out."
+                    )
+                font_size = int(2 * sizes[0] * sizes[1] / (sizes[0] + sizes[1])) if len(sizes) > 1 else sizes[0]
+        else:
+            font_size = max_font_size
+        self.words_ = dict(frequencies)
+
+        if self.repeat and len(frequencies) < self.max_words:
+            times_extend = int(np.ceil(self.max_words / len(frequencies))) - 1
+            frequencies_org = list(frequencies)
+            downweight = frequencies[-1][1]
+            for i in range(times_extend):
+                frequencies.extend([(word, freq * downweight ** (i + 1)) for word, freq in frequencies_org])
+
+        layout = []
+        last_freq = 1.0
+        for word, freq in frequencies:
+            if freq == 0:
+                continue
+            if self.relative_scaling != 0:
+                font_size = int(
+                    round((self.relative_scaling * (freq / float(last_freq)) + (1 - self.relative_scaling)) * font_size)
+                )
+            if random_state.random() < self.prefer_horizontal:
+                orientations = (None, Image.ROTATE_90) if self.prefer_horizontal < 1 else (None,)
+            else:
+                orientations = (Image.ROTATE_90, None)
+            placement = (
+                self._place_word(occupancy, word, font_size, orientations)
+                if font_size >= self.min_font_size
+                else None
+            )
+            if placement is None:
+                break  # as WordCloud, stop when a word does not fit at the minimum font size
+            font_size, orientation, position, transposed_font = placement
+            x, y = np.array(position) + self.margin // 2
+            draw.text((y, x), word, fill="white", font=transposed_font)
+            color = self.color_func(
+                word,
+                font_size=font_size,
+                position=(x, y),
+                orientation=orientation,
+                random_state=random_state,
+                font_path=self.font_path,
+            )
+            layout.append(((word, freq), font_size, (x, y), orientation, color))
+            # Only the pixels of the new word are read back to update the occupancy index
+            box_width, box_height = transposed_font.get_text_size(word)
+            left, top = max(y, 0), max(x, 0)
+            right, bottom = min(y + box_width, width), min(x + box_height, height)
+            if left < right and top < bottom:
+                occupancy.update(np.asarray(img_grey.crop((left, top, right, bottom))), top, left)
+            last_freq = freq
+
+        self.layout_ = layout
+        return self
@@ -3,24 +3,47 @@
 
 import random
 import os
-from typing import List, AnyStr, Tuple, Dict, Generator, BinaryIO
-from collections import Counter
+import logging
+import multiprocessing
+from typing import List, AnyStr, Tuple, Dict, Generator, BinaryIO, Iterable
+from itertools import islice
 from io import BytesIO
 from functools import lru_cache
 import zlib
 
-import matplotlib
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.font_manager import FontProperties, findfont
+import numpy as np
 import pandas as pd
+from PIL import Image, ImageDraw
 from wordcloud import WordCloud
 import pathvalidate
 from fastcore.utils import store_attr
-from spacy.tokens import Doc
+from spacy.lexeme import Lexeme
+from spacy.attrs import ORTH
 
+from font_cache import install_font_cache, get_font
 from spacy_tokenizer import MultilingualTokenizer
-from utils import time_logging
+from token_count_table import TokenCountTable
+from wordcloud_layout import SpiralWordCloud
+from utils import time_logging, get_num_available_cpus
 
-matplotlib.use("agg")
+install_font_cache()  # fonts and word sprites are shared by all wordclouds of the process
+
+_WORKER_VISUALIZER = None
+"""WordcloudVisualizer instance used by each worker process when rendering wordclouds with multiple processes"""
+
+
+def _initialize_worker(visualizer: "WordcloudVisualizer") -> None:
+    """Initializer of worker processes: store the (pickled) visualizer as a process-wide global"""
+    global _WORKER_VISUALIZER
+    _WORKER_VISUALIZER = visualizer
+
+
+def _render_wordcloud_in_worker(frequencies: Dict, language: AnyStr, title: AnyStr = None) -> bytes:
+    """Render a wordcloud in a worker process and return the png file content"""
+    return _WORKER_VISUALIZER._render_wordcloud(frequencies, language, title).getvalue()
 
 
 class WordcloudVisualizer:
@@ -35,6 +58,22 @@ class WordcloudVisualizer:
         language_column (str, optional): Name of the language column
         subchart_column (str, optional): Name of the subcharts column to compute wordclouds on, defaults to None
         max_words (int, optional): Maximum number of words to display in wordcloud, defaults to 100
+        weight_column (str, optional): Name of a numeric column with the weight of each text, defaults to None.
+            Token counts of each text are multiplied by its weight.
+        max_num_tokens_per_subchart (int, optional): If set, count tokens approximately with a fixed memory budget
+            of this number of tokens per subchart, see `TokenCountTable`. Defaults to None for exact counting.
+            If `case_insensitive` is set, the budget applies to groups of case versions of a token.
+        n_process (int, optional): Number of processes to render subcharts in parallel, -1 to use all CPUs
+            available to the process (within its cgroup quota, e.g. in a container), up to MAX_NUM_PROCESS.
+            Defaults to 1, which renders subcharts one by one.
+        multiprocessing_start_method (str, optional): Start method of the worker processes: "spawn", "forkserver"
+            or "fork". Defaults to "spawn".
+        renderer (str, optional): Backend drawing the wordcloud images: "matplotlib" or "pil", defaults to "matplotlib".
+            The "pil" renderer composes the wordcloud bitmap and its title directly with PIL, with the same layout
+            as the "matplotlib" renderer, which is faster and uses less memory.
+        layout_engine (str, optional): Engine placing words: "random" or "spiral", defaults to "random".
+            The "random" engine is the random search of the wordcloud package. The "spiral" engine places words along
+            a spiral over a bitmap occupancy index, see `SpiralWordCloud`, which is faster on large canvases only.
 
     """
 
@@ -50,6 +89,19 @@ class WordcloudVisualizer:
     DEFAULT_PAD_INCHES = 1
     DEFAULT_BBOX_INCHES = "tight"
     DEFAULT_BACKGROUND_COLOR = "white"
+    DEFAULT_NUM_PROCESS = 1
+    # Maximum number of processes with n_process=-1, as each worker holds its own fonts and wordcloud bitmaps
+    MAX_NUM_PROCESS = 8
+    DEFAULT_MULTIPROCESSING_START_METHOD = "spawn"
+    RENDERER_MATPLOTLIB = "matplotlib"
+    RENDERER_PIL = "pil"
+    DEFAULT_RENDERER = RENDERER_MATPLOTLIB
+    LAYOUT_ENGINE_RANDOM = "random"
+    LAYOUT_ENGINE_SPIRAL = "spiral"
+    DEFAULT_LAYOUT_ENGINE = LAYOUT_ENGINE_RANDOM
+    # Fraction of the figure width and height taken by the axes with the default matplotlib subplot parameters
+    AXES_SIZE_FRACTION = (0.775, 0.77)
+    POINTS_PER_INCH = 72
 
     DEFAULT_FONT = "NotoSansMerged-Regular-1000upem.ttf"
     """Multilingual font created from the fusion of the following Noto Sans fonts:
@@ -93,7 +145,9 @@ class WordcloudVisualizer:
         remove_punctuation: bool = True,
         case_insensitive: bool = False,
         subchart_column: AnyStr = None,
+        weight_column: AnyStr = None,
         max_words: int = DEFAULT_MAX_WORDS,
+        max_num_tokens_per_subchart: int = None,
         color_list: List = DEFAULT_COLOR_LIST,
         font: str = DEFAULT_FONT,
         scale: float = DEFAULT_SCALE,
@@ -106,6 +160,10 @@ class WordcloudVisualizer:
         pad_inches: int = DEFAULT_PAD_INCHES,
         bbox_inches: str = DEFAULT_BBOX_INCHES,
         background_color: str = DEFAULT_BACKGROUND_COLOR,
+        n_process: int = DEFAULT_NUM_PROCESS,
+        multiprocessing_start_method: AnyStr = DEFAULT_MULTIPROCESSING_START_METHOD,
+        renderer: AnyStr = DEFAULT_RENDERER,
+        layout_engine: AnyStr = DEFAULT_LAYOUT_ENGINE,
     ):
         """Initialization method for the WordcloudVisualizer class, with optional arguments etailed above"""
 
@@ -115,6 +173,16 @@ class WordcloudVisualizer:
         if self.subchart_column == "order66":
             self.font = "DeathStar.otf"
             self.subchart_column = None
+        if self.renderer not in {self.RENDERER_MATPLOTLIB, self.RENDERER_PIL}:
+            raise ValueError(f"Unsupported renderer: '{self.renderer}'")
+        if self.layout_engine not in {self.LAYOUT_ENGINE_RANDOM, self.LAYOUT_ENGINE_SPIRAL}:
+            raise ValueError(f"Unsupported layout engine: '{self.layout_engine}'")
+
+    def __getstate__(self) -> dict:
+        """Return the state to pickle when sending the visualizer to worker processes, which do not tokenize"""
+        state = self.__dict__.copy()
+        state["tokenizer"] = None
+        return state
 
     @lru_cache(maxsize=1024)
     def _color_func(self, word: AnyStr, **kwargs) -> AnyStr:
@@ -128,9 +196,10 @@ class WordcloudVisualizer:
         return self.FONT_EXCEPTIONS_DICT.get(language, self.font)
 
     def _get_wordcloud(self, frequencies, font_path):
-        """Return a wordcloud object"""
+        """Return a wordcloud object, laid out with the chosen layout engine"""
+        wordcloud_class = SpiralWordCloud if self.layout_engine == self.LAYOUT_ENGINE_SPIRAL else WordCloud
         wordcloud = (
-            WordCloud(
+            wordcloud_class(
                 background_color=self.background_color,
                 scale=self.scale,
                 margin=self.margin,
@@ -144,202 +213,400 @@ class WordcloudVisualizer:
 
         return wordcloud
 
-    def _generate_wordcloud(
-        self, frequencies: Dict, language: AnyStr, title: AnyStr = None
-    ) -> matplotlib.pyplot.figure:
-        """Return a wordcloud as a matplotlib figure"""
+    def _generate_wordcloud(self, frequencies: Dict, language: AnyStr, title: AnyStr = None) -> Figure:
+        """Return a wordcloud as a matplotlib figure with its own Agg canvas
+
+        The figure is built without pyplot, so it is not registered in any global state
+        and rendering is safe to run in several threads at once.
+        """
         # Manage font exceptions based on language
         font = self._retrieve_font(language)
         font_path = os.path.join(self.font_folder_path, font)
         # Generate wordcloud
         wc = self._get_wordcloud(frequencies, font_path)
-        fig = plt.figure(figsize=self.figsize, dpi=self.dpi)
-        fig.tight_layout()
-        plt.axis("off")
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.axis("off")
         if title:
-            plt.rcParams["axes.titlepad"] = self.titlepad
-            plt.rcParams["axes.titlesize"] = self.titlesize
-            plt.title(title)
-        plt.imshow(wc, interpolation="bilinear")
+            ax.set_title(title, pad=self.titlepad, fontsize=self.titlesize)
+        ax.imshow(wc, interpolation="bilinear")
         return fig
 
-    @time_logging(log_message="Preparing data")
-    def _prepare_data(self, df: pd.DataFrame) -> List:
-        """Private method to reshape data depending on language and subcharts settings
-        Args:
-            df: dataframe containing a text column and, optionally, language and subcharts columns
-        Returns:
-            List of pandas dataframes with one dataframe per language per subchart
+    def _generate_wordcloud_image(self, frequencies: Dict, language: AnyStr, title: AnyStr = None) -> Image.Image:
+        """Return a wordcloud as a PIL image, laid out as the matplotlib figure of `_generate_wordcloud`
+
+        The wordcloud bitmap is resized to the size of the figure axes, with the title above it,
+        and padded with `pad_inches` on each side as a figure saved with a tight bounding box.
         """
-        if self.subchart_column or self.language_column:
-            # Group data per language and subchart for tokenization
-            group_columns = [col for col in [self.language_column, self.subchart_column] if col]
-            df.dropna(subset=group_columns, inplace=True)
-            df_grouped = df.groupby(group_columns)
-        else:
-            # Simply format data similarly
-            df_grouped = [(self.language, df)]
+        # Manage font exceptions based on language
+        font = self._retrieve_font(language)
+        font_path = os.path.join(self.font_folder_path, font)
+        # Generate wordcloud
+        wc_image = self._get_wordcloud(frequencies, font_path).to_image()
+        axes_width = self.figsize[0] * self.dpi * self.AXES_SIZE_FRACTION[0]
+        axes_height = self.figsize[1] * self.dpi * self.AXES_SIZE_FRACTION[1]
+        resize_ratio = min(axes_width / wc_image.width, axes_height / wc_image.height)
+        wc_image = wc_image.resize(
+            (round(wc_image.width * resize_ratio), round(wc_image.height * resize_ratio)), resample=Image.BILINEAR
+        )
+        pad = round(self.pad_inches * self.dpi)
+        width, height = wc_image.width, wc_image.height
+        title_height = 0
+        if title:
+            title_font_size = round(self.titlesize * self.dpi / self.POINTS_PER_INCH)
+            title_font = get_font(findfont(FontProperties()), size=title_font_size)
+            # Title box is at least as high as "lp", as in matplotlib
+            title_ascent = -min(title_font.getbbox(text, anchor="ls")[1] for text in ("lp", title))
+            title_height = round(title_ascent + self.titlepad * self.dpi / self.POINTS_PER_INCH)
+            width = max(width, title_font.getbbox(title, anchor="ls")[2])
+            height += title_height
+        image = Image.new("RGB", (width + 2 * pad, height + 2 * pad), color=self.background_color)
+        image.paste(wc_image, (pad + (width - wc_image.width) // 2, pad + title_height))
+        if title:
+            ImageDraw.Draw(image).text(
+                (pad + width // 2, pad + title_ascent), title, fill="black", font=title_font, anchor="ms"
+            )
+        return image
 
-        return df_grouped
+    def _prepare_data(self, df: pd.DataFrame) -> List[Tuple[AnyStr, pd.Series, np.ndarray, np.ndarray]]:
+        """Private method to reshape data depending on language and subcharts settings
+
+        Texts are grouped by language only, so that each language is tokenized in a single stream,
+        whatever the number of subcharts. The subchart of each text is carried alongside as an integer code
+        giving its position in the `subcharts` attribute, as well as its weight.
 
-    def _tokenize_texts(self, df_grouped: List) -> List:
-        """Private method to tokenize each group of observations in its correct language
         Args:
-            df_grouped: list of pandas dataframes with one dataframe per language per subchart
+            df: dataframe containing a text column and, optionally, language, subcharts and weight columns
         Returns:
-            List of spacy docs
+            List of tuples (language, texts, subchart_codes, weights) with one tuple per language
         """
-        # Get language and subchart name for each group
-        texts = []
-        group_names = []
-        for name, group in df_grouped:
-            texts.append(list(group[self.text_column]))
-            group_names.append(name)
-
-        # Get tokenization languages differently depending on language/subchart settings combinations
-        if not self.language_column and not self.subchart_column:
-            languages = [self.language]
-        elif self.language_column and self.subchart_column:
-            languages, subcharts = zip(*group_names)
-            languages = list(languages)
+        group_columns = [col for col in [self.language_column, self.subchart_column, self.weight_column] if col]
+        if group_columns:
+            df.dropna(subset=group_columns, inplace=True)
+        if self.weight_column:
+            # Rows with a zero or negative weight do not contribute to any count
+            df = df[df[self.weight_column] > 0]
+            weights = df[self.weight_column].to_numpy(dtype=np.float64)
+        else:
+            weights = np.ones(len(df.index), dtype=np.int64)
+        if self.subchart_column:
+            subchart_codes, subcharts = pd.factorize(df[self.subchart_column], sort=True)
             self.subcharts = list(subcharts)
-        elif self.subchart_column:
-            self.subcharts = group_names
-            languages = [self.language] * len(self.subcharts)
         else:
-            languages = group_names
+            subchart_codes = np.zeros(len(df.index), dtype=np.int64)
+            self.subcharts = [""]
+        if self.language_column:
+            # Group data per language for tokenization
+            df_prepared = [
+                (language, df[self.text_column].iloc[positions], subchart_codes[positions], weights[positions])
+                for language, positions in df.groupby(self.language_column, sort=True).indices.items()
+            ]
+        else:
+            # Simply format data similarly
+            df_prepared = [(self.language, df[self.text_column], subchart_codes, weights)]
 
-        # Tokenize
-        docs = [
-            Doc.from_docs(self.tokenizer.tokenize_list(text_list, language))
-            for text_list, language in zip(texts, languages)
-        ]
-        return docs
+        return df_prepared
 
-    def _normalize_case_token_counts(self, counts: Counter) -> Counter:
-        """Private method to normalize a token counter to make it case-insensitive
+    @time_logging(log_message="Tokenizing and counting tokens")
+    def _tokenize_and_count_texts(self, df_iterator: Iterable[pd.DataFrame]) -> TokenCountTable:
+        """Private method to tokenize texts in their correct language and count their tokens by subchart
 
-        It works by summing the counts of multiple case versions e.g., "The" and "the".
-        It then selects the case version with the highest count to represent the whole group.
-        In case of a tie, the lowercase version is chosen.
+        Each chunk of data is prepared, tokenized and counted before the next one is read, so that memory usage
+        depends on the chunk size, not the dataset size. Subcharts are mapped to stable rows of a single table,
+        which are sorted once all chunks have been counted.
 
         Args:
-            counts: token counter e.g., Counter({"The": 3, "the": 5, "best": 3, "Best": 4})
+            df_iterator: iterator of dataframes containing text data
         Returns:
-            New token counter with a single case version for each token and the sum of counts across case versions
-                e.g., Counter({"the": 8, "Best": 7})
+            Table of token counts with one row per subchart
         """
-        df_counts = pd.DataFrame.from_dict(counts.items())
-        df_counts.columns = ["token", "token_count"]
-        df_counts["token_lower"] = df_counts.token.str.lower()
-        df_counts_agg = df_counts.groupby("token_lower").token_count.agg(["sum", "idxmax"]).reset_index()
-        df_counts_agg["token_majority_case"] = df_counts_agg["idxmax"].apply(lambda x: df_counts.loc[x, "token"])
-        normalized_counts = Counter(dict(zip(df_counts_agg.token_majority_case, df_counts_agg["sum"])))
-        return normalized_counts
+        counts = TokenCountTable(
+            [] if self.subchart_column else [""],
+            max_num_tokens_per_row=self.max_num_tokens_per_subchart,
+            dtype=np.float64 if self.weight_column else np.int64,
+            case_insensitive=self.case_insensitive,
+        )
+        num_rows = 0
+        for df in df_iterator:
+            df_prepared = self._prepare_data(df)
+            subchart_rows = counts.get_rows(self.subcharts)
+            for language, text_list, subchart_codes, weights in df_prepared:
+                self._count_text_tokens(counts, text_list, language, subchart_rows[subchart_codes], weights)
+            num_rows += len(df.index)
+            logging.info(f"Tokenized and counted {num_rows} rows")
+        counts.sort_rows()
+        self.subcharts = counts.subcharts
+        if self.max_num_tokens_per_subchart:
+            self._log_error_bounds(counts)
+        return counts
 
-    def _save_chart(self, fig: plt.figure) -> BytesIO:
-        """Private method to save chart as a bytes stream
+    def _log_error_bounds(self, counts: TokenCountTable) -> None:
+        """Private method to log the error bounds of approximate token counts"""
+        for subchart, error_bound in zip(counts.subcharts, counts.get_error_bounds().tolist()):
+            subchart_name = f" for subchart '{subchart}'" if self.subchart_column else ""
+            if error_bound:
+                logging.info(
+                    f"Approximate counting{subchart_name}: counts are overestimated by at most {error_bound}, "
+                    + "tokens with a lower count may be missing"
+                )
+            else:
+                logging.info(f"Approximate counting{subchart_name}: counts are exact")
+
+    def _count_text_tokens(
+        self,
+        counts: TokenCountTable,
+        text_list: Iterable[AnyStr],
+        language: AnyStr,
+        subchart_codes: np.ndarray,
+        weights: np.ndarray,
+    ) -> None:
+        """Private method to tokenize texts and count their tokens by subchart in a single streaming pass
+
+        Exact duplicates of a (text, subchart) pair are tokenized once, and their token counts are multiplied
+        by the total weight of duplicates, so that tokenization work is proportional to the number of unique texts.
+        Token ids are counted batch by batch as documents are yielded by the tokenizer,
+        then documents are dropped, so that memory usage is bounded by the batch size, not the number of texts.
+        Long texts are split into chunks by the tokenizer, whose tokens are attributed back to the original text.
+        Counts are attributed to subcharts with the subchart code of the document each token belongs to.
 
         Args:
-            fig (plt.figure): matplotlib figure to save
+            counts: Table of token counts to which counts are added
+            text_list: Iterable of strings
+            language: Language code in ISO 639-1 format
+            subchart_codes: Array with the subchart code of each text
+            weights: Array with the weight of each text, by which the counts of its tokens are multiplied
+        """
+        text_list, subchart_codes, text_weights = self._deduplicate_texts(text_list, subchart_codes, weights)
+        docs = self.tokenizer.tokenize_chunks_iter(text_list, language)
+        token_columns = {}  # token id (key) and table column (value), -1 if filtered out
+        num_compactions = counts.num_compactions
+        for batch in iter(lambda: list(islice(docs, self.tokenizer.batch_size)), []):
+            if counts.num_compactions != num_compactions:  # columns were renumbered, only filters remain valid
+                token_columns = {token_id: column for token_id, column in token_columns.items() if column < 0}
+                num_compactions = counts.num_compactions
+            text_positions = np.array([position for position, _ in batch], dtype=np.int64)
+            batch = [doc for _, doc in batch]
+            vocab = batch[0].vocab
+            token_ids = np.concatenate([doc.to_array(ORTH) for doc in batch])
+            doc_lengths = [len(doc) for doc in batch]
+            token_subchart_codes = np.repeat(subchart_codes[text_positions], doc_lengths)
+            token_weights = np.repeat(text_weights[text_positions], doc_lengths)
+            pair_subchart_codes, pair_token_ids, pair_counts = self._count_token_ids(
+                token_ids, token_subchart_codes, token_weights
+            )
+            unique_token_ids, token_id_positions = np.unique(pair_token_ids, return_inverse=True)
+            unique_token_columns = np.empty(len(unique_token_ids), dtype=np.int64)
+            for i, token_id in enumerate(unique_token_ids.tolist()):
+                if token_id not in token_columns:  # filters are evaluated once per lexeme
+                    lexeme = vocab[token_id]
+                    token_columns[token_id] = (
+                        counts.get_column(token_id, lexeme.orth_, lexeme.lower)
+                        if self._is_counted_lexeme(lexeme)
+                        else -1
+                    )  # Equivalently, token.lemma_
+                unique_token_columns[i] = token_columns[token_id]
+            pair_columns = unique_token_columns[token_id_positions]
+            is_counted = pair_columns >= 0
+            counts.add_counts(pair_subchart_codes[is_counted], pair_columns[is_counted], pair_counts[is_counted])
+
+    def _save_chart(self, fig: Figure) -> BytesIO:
+        """Private method to save chart as a bytes stream, and release the figure
+
+        Args:
+            fig (Figure): matplotlib figure to save
 
         Returns:
             BytesIO: bytes stream containing the chart's data
         """
         temp = BytesIO()
-        fig.savefig(temp, bbox_inches=self.bbox_inches, pad_inches=self.pad_inches, dpi=fig.dpi)
-        plt.close()
+        try:
+            fig.savefig(temp, bbox_inches=self.bbox_inches, pad_inches=self.pad_inches, dpi=fig.dpi)
+        finally:
+            fig.clear()  # release the axes and the wordcloud bitmap right away
         return temp
 
-    @time_logging(log_message="Counting tokens")
-    def _count_tokens(self, docs: List[Doc]) -> List[Tuple[AnyStr, Dict]]:
-        """Private method to count tokens for each document in corpus
+    def _save_image(self, image: Image.Image) -> BytesIO:
+        """Private method to save a PIL image as a bytes stream containing a png file"""
+        temp = BytesIO()
+        image.save(temp, format="PNG")
+        return temp
+
+    def _is_counted_lexeme(self, lexeme: Lexeme) -> bool:
+        """Private method to check if a lexeme passes the whitespace, stopword and punctuation filters"""
+        if lexeme.is_space:
+            return False
+        if self.remove_stopwords and lexeme.is_stop:
+            return False
+        if self.remove_punctuation and lexeme.is_punct:
+            return False
+        return True
+
+    @staticmethod
+    def _count_token_ids(
+        token_ids: np.ndarray, subchart_codes: np.ndarray, token_weights: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Private method to count an array of token hash ids by subchart at the type level
+
+        Counting ids instead of Token objects allows filters to be evaluated once per unique lexeme
+        instead of once per token, and strings to be resolved only for the lexemes which pass the filters.
+
         Args:
-            docs: list of spacy docs on which to count tokens
+            token_ids: array of ORTH hash ids, as returned by `Doc.to_array`
+            subchart_codes: array with the subchart code of each token
+            token_weights: array of weights, one per token, which are summed to count tokens
         Returns:
-            List of tuples (subchart, counter) where subchart is the subchart the counter belongs to
+            Tuple of arrays with the subchart code, token id and count of each unique (subchart code, token id) pair,
+            ordered by first occurrence
         """
-        counters = []
-        for doc in docs:
-            counter = Counter()
-            for token in doc:
-                if not token.is_space:
-                    token_is_stopwords = token.is_stop if self.remove_stopwords else False
-                    if not token_is_stopwords:
-                        token_is_punctuation = token.is_punct if self.remove_punctuation else False
-                        if not token_is_punctuation:
-                            counter[token.text] += 1  # Equivalently, token.lemma_
-            counters.append(counter)
-
-        if not self.subchart_column:
-            counts = sum(counters, Counter())
-            if self.case_insensitive:
-                counts = self._normalize_case_token_counts(counts)
-            return [("", dict(counts))]
-        else:
-            counts = list(zip(self.subcharts, counters))
-            # Aggregate counts by subchart
-            temp_count = {}
-            for subchart, count in counts:
-                if subchart in temp_count.keys():
-                    temp_count[subchart].update(count)
-                else:
-                    temp_count[subchart] = count
-            if self.case_insensitive:
-                temp_count = {
-                    subchart: self._normalize_case_token_counts(count) for subchart, count in temp_count.items()
-                }
-            counts = list(temp_count.items())
-
-            # Remove subcharts emptied by aggregation
-            counts = [(subchart, count) for subchart, count in counts if count]
-            return counts
-
-    def generate_wordclouds(self, counts: List[Tuple[AnyStr, Dict]]) -> Generator[Tuple[BinaryIO, AnyStr], None, None]:
+        pairs = np.stack([subchart_codes.astype(np.uint64), token_ids.astype(np.uint64)], axis=1)
+        unique_pairs, first_indices, pair_positions = np.unique(pairs, axis=0, return_index=True, return_inverse=True)
+        pair_counts = np.bincount(pair_positions.ravel(), weights=token_weights, minlength=len(unique_pairs))
+        first_occurrence_order = np.argsort(first_indices, kind="stable")
+        unique_pairs = unique_pairs[first_occurrence_order]
+        return (
+            unique_pairs[:, 0].astype(np.int64),
+            unique_pairs[:, 1],
+            pair_counts[first_occurrence_order].astype(token_weights.dtype),
+        )
+
+    @staticmethod
+    def _deduplicate_texts(
+        text_list: Iterable[AnyStr], subchart_codes: np.ndarray, weights: np.ndarray
+    ) -> Tuple[pd.Series, np.ndarray, np.ndarray]:
+        """Private method to collapse exact duplicates of (text, subchart code) pairs
+
+        Texts are hashed in a vectorized way with `pandas.factorize`. Unique pairs are kept in order of first
+        occurrence, so that tokens are counted in the same order as without deduplication.
+
+        Args:
+            text_list: Iterable of strings
+            subchart_codes: array with the subchart code of each text
+            weights: array with the weight of each text
+        Returns:
+            Tuple with the unique texts, their subchart codes and the total weight of their occurrences
+        """
+        text_series = text_list if isinstance(text_list, pd.Series) else pd.Series(list(text_list), dtype=object)
+        text_codes, _ = pd.factorize(text_series)
+        pair_keys = text_codes.astype(np.int64) * (int(subchart_codes.max(initial=0)) + 1) + subchart_codes
+        _, first_indices, pair_positions = np.unique(pair_keys, return_index=True, return_inverse=True)
+        pair_weights = np.bincount(pair_positions, weights=weights, minlength=len(first_indices))
+        first_occurrence_order = np.argsort(first_indices, kind="stable")
+        first_indices = first_indices[first_occurrence_order]
+        return (
+            text_series.iloc[first_indices],
+            subchart_codes[first_indices],
+            pair_weights[first_occurrence_order].astype(weights.dtype),
+        )
+
+    @time_logging(log_message="Aggregating token counts")
+    def _aggregate_counts(self, counts: TokenCountTable) -> TokenCountTable:
+        """Private method to normalize the case of token counts by subchart, if required
+
+        Case versions are grouped by the LOWER hash id recorded at count time, see `TokenCountTable.fold_case`.
+        In case of a tie, the lowercase version is chosen.
+
+        Args:
+            counts: table of token counts with one row per subchart
+        Returns:
+            Table of token counts with one row per subchart
+        """
+        if self.case_insensitive:
+            counts = counts.fold_case()
+        return counts
+
+    def _render_wordcloud(self, frequencies: Dict, language: AnyStr, title: AnyStr = None) -> BytesIO:
+        """Private method to render a wordcloud as a bytes stream containing a png file, with the chosen renderer"""
+        if self.renderer == self.RENDERER_PIL:
+            image = self._generate_wordcloud_image(frequencies=frequencies, language=language, title=title)
+            return self._save_image(image)
+        fig = self._generate_wordcloud(frequencies=frequencies, language=language, title=title)
+        return self._save_chart(fig)
+
+    def _get_num_process(self) -> int:
+        """Return the number of processes to use for rendering"""
+        if self.n_process == -1:
+            return min(get_num_available_cpus(), self.MAX_NUM_PROCESS)
+        return max(1, self.n_process)
+
+    def _render_wordclouds_multiprocess(
+        self, charts: List[Tuple[Dict, AnyStr, AnyStr, AnyStr]], chart_sizes: List[int], num_process: int
+    ) -> Generator[Tuple[BinaryIO, AnyStr], None, None]:
+        """Private method to render wordclouds in a pool of worker processes
+
+        Charts are scheduled from the largest to the smallest vocabulary, so that the slowest renderings
+        start first and workers finish at about the same time, but they are yielded in input order.
+        Each rendering seeds its own random generators with `random_state`, so images are identical to serial mode.
+
+        Args:
+            charts: List of tuples (frequencies, language, title, file name), one per wordcloud
+            chart_sizes: Number of distinct tokens of each chart before truncation to `max_words`
+            num_process: Number of worker processes
+
+        Yields:
+            One tuple (bytes, filename) per chart, in the order of `charts`
+        """
+        num_process = min(num_process, len(charts))
+        logging.info(
+            f"Starting {num_process} rendering worker processes with '{self.multiprocessing_start_method}' method"
+        )
+        context = multiprocessing.get_context(self.multiprocessing_start_method)
+        with context.Pool(processes=num_process, initializer=_initialize_worker, initargs=(self,)) as process_pool:
+            results = [None] * len(charts)
+            for index in sorted(range(len(charts)), key=chart_sizes.__getitem__, reverse=True):
+                frequencies, language, title, _ = charts[index]
+                results[index] = process_pool.apply_async(_render_wordcloud_in_worker, (frequencies, language, title))
+            for (_, _, _, output_file_name), result in zip(charts, results):
+                yield (BytesIO(result.get()), output_file_name)
+
+    def generate_wordclouds(self, counts: TokenCountTable) -> Generator[Tuple[BinaryIO, AnyStr], None, None]:
         """Public method to generate wordclouds and yield them as bytes-like objects
+        Only the `max_words` most frequent tokens of each subchart are passed to the wordcloud renderer.
+        If `n_process` is higher than 1, subcharts are rendered in parallel, see `_render_wordclouds_multiprocess`.
         Args:
-            counts: list of tuples( subchart, counter) where subchart is the subchart the counter belongs to
+            counts: table of token counts with one row per subchart
         Yields:
-            One tuple (bytes, filename) per subchart where bytes contains data from a wordcloud png file
+            One tuple (bytes, filename) per non-empty subchart where bytes contains data from a wordcloud png file
         """
+        charts = []
+        chart_sizes = [num_tokens for num_tokens in counts.matrix.getnnz(axis=1).tolist() if num_tokens]
         if self.subchart_column:
-            for name, count in counts:
+            for name, count in counts.items(max_words=self.max_words):
                 # Generate file name and chart title
                 output_file_name = pathvalidate.sanitize_filename(
                     f"wordcloud_{self.subchart_column}_{name}.png"
                 ).lower()
                 wordcloud_title = f"{self.subchart_column}: {name}"
-                # Generate chart
-                if self.language_as_subchart:
-                    fig = self._generate_wordcloud(
-                        frequencies=count,
-                        language=name,
-                        title=wordcloud_title,
-                    )
-                else:
-                    fig = self._generate_wordcloud(frequencies=count, language=self.language, title=wordcloud_title)
-                # Return chart
-                temp = self._save_chart(fig)
-                yield (temp, output_file_name)
-
+                language = name if self.language_as_subchart else self.language
+                charts.append((count, language, wordcloud_title, output_file_name))
         else:
-            # Generate chart
-            count = counts[0][1]
-            fig = self._generate_wordcloud(frequencies=count, language=self.language)
-            # Return chart
-            temp = self._save_chart(fig)
-            yield (temp, "wordcloud.png")
-
-    def tokenize_and_count(self, df: pd.DataFrame) -> List[Tuple[AnyStr, Dict]]:
+            count = counts.get_row_counts(0, max_words=self.max_words)
+            charts.append((count, self.language, None, "wordcloud.png"))
+        num_process = self._get_num_process()
+        if num_process > 1 and len(charts) > 1:
+            yield from self._render_wordclouds_multiprocess(charts, chart_sizes, num_process)
+        else:
+            for frequencies, language, title, output_file_name in charts:
+                yield (self._render_wordcloud(frequencies, language, title), output_file_name)
+
+    def tokenize_and_count(self, df: pd.DataFrame) -> TokenCountTable:
         """Public method to prepare data before generating wordclouds.
         Preparation consists in tokenizing and reshaping text data according to language and subcharts settings
         Counting consists in counting tokens per subchart
         Args:
             df: DataFrame containing text data, with optional additional columns for language and subchart
         Returns:
-            List of tuples (subchart, counter) where subchart is the subchart the counter belongs to
+            Table of token counts with one row per subchart, see `TokenCountTable.to_list` to get counters
+        """
+        return self.tokenize_and_count_chunks([df])
+
+    def tokenize_and_count_chunks(self, df_iterator: Iterable[pd.DataFrame]) -> TokenCountTable:
+        """Public method to prepare data and count tokens per subchart, streaming over chunks of data
+        Args:
+            df_iterator: iterator of DataFrames containing text data, with the same columns as in `tokenize_and_count`
+        Returns:
+            Table of token counts with one row per subchart, see `TokenCountTable.to_list` to get counters
         """
-        df_prepared = self._prepare_data(df)
-        docs = self._tokenize_texts(df_prepared)
-        counts = self._count_tokens(docs)
+        counts = self._tokenize_and_count_texts(df_iterator)
+        counts = self._aggregate_counts(counts)
         return counts
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# This is a test file intended to be used with pytest
+# pytest automatically runs all the function starting with "test_"
+# see https://docs.pytest.org for more information
+
+import os
+import stat
+import tempfile
+
+from plugin_io_utils import get_user_temp_folder_path
+
+
+def test_get_user_temp_folder_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    folder_path = get_user_temp_folder_path("cache")
+    assert os.path.dirname(folder_path) == str(tmp_path)
+    assert stat.S_IMODE(os.stat(folder_path).st_mode) == 0o700
+    assert get_user_temp_folder_path("cache") == folder_path
+    os.chmod(folder_path, 0o777)  # as if another user could have written files to it
+    other_folder_path = get_user_temp_folder_path("cache")
+    assert other_folder_path != folder_path
+    assert stat.S_IMODE(os.stat(other_folder_path).st_mode) == 0o700
@@ -8,7 +8,7 @@ import os
 import pytest
 import pandas as pd
 
-from spacy_tokenizer import MultilingualTokenizer
+from spacy_tokenizer import MultilingualTokenizer, TokenizationError
 
 stopwords_folder_path = os.getenv("STOPWORDS_FOLDER_PATH", "path_is_no_good")
 
@@ -54,3 +54,202 @@ def test_tokenize_df_long_text():
     tokenizer = MultilingualTokenizer(max_num_characters=1)
     with pytest.raises(ValueError):
         tokenizer.tokenize_df(df=input_df, text_column="input_text", language="en")
+
+
+def test_tokenize_list_multiprocess():
+    text_list = ["I hope nothing. I fear nothing. I am free. 💩 😂 #OMG", "Les sanglots longs des violons d'automne"] * 3
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path, batch_size=2, n_process=2)
+    tokenized_documents = tokenizer.tokenize_list(text_list=text_list, language="en")
+    tokenizer.close()
+    expected_documents = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path).tokenize_list(
+        text_list=text_list, language="en"
+    )
+    assert [doc.text for doc in tokenized_documents] == text_list
+    assert [[(t.text, t.is_stop) for t in doc] for doc in tokenized_documents] == [
+        [(t.text, t.is_stop) for t in doc] for doc in expected_documents
+    ]
+
+
+def test_tokenize_list_multiprocess_lemmatization():
+    text_list = ["The cats were running quickly"] * 4
+    tokenizer = MultilingualTokenizer(batch_size=2, n_process=2)
+    tokenizer.add_spacy_tokenizer("en")
+    tokenizer._activate_components_to_lemmatize("en")
+    tokenized_documents = tokenizer.tokenize_list(text_list=text_list, language="en")
+    tokenizer.spacy_nlp_dict["en"].add_pipe("sentencizer")
+    with pytest.raises(TokenizationError):
+        tokenizer.tokenize_list(text_list=text_list, language="en")
+    tokenizer.close()
+    assert [[t.lemma_ for t in doc] for doc in tokenized_documents] == [["The", "cat", "be", "run", "quickly"]] * 4
+
+
+def test_tokenize_iter():
+    text_list = ["I hope nothing.", None, "I am free. 💩 😂 #OMG"]
+    tokenizer = MultilingualTokenizer()
+    tokenized_documents = tokenizer.tokenize_iter(text_list=iter(text_list), language="en")
+    assert [len(doc) for doc in tokenized_documents] == [4, 0, 7]
+
+
+def test_tokenize_df_chunks():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", " Les sanglots longs des violons d'automne", "I am free."],
+            "language": ["en", "fr", "en"],
+        }
+    )
+    tokenizer = MultilingualTokenizer()
+    df_iterator = (input_df.iloc[i : i + 2] for i in range(0, len(input_df.index), 2))
+    output_dfs = list(tokenizer.tokenize_df_chunks(df_iterator, text_column="input_text", language_column="language"))
+    tokenized_documents = pd.concat(output_dfs)[tokenizer.tokenized_column]
+    assert [len(doc) for doc in tokenized_documents] == [4, 8, 4]
+
+
+def test_tokenize_list_snapshot_cache(tmp_path):
+    text_list = ["I hope nothing. I fear nothing. I am free. 💩 😂 #OMG", "子曰：“學而不思則罔，思而不學則殆。”"]
+    tokenized_documents = {}
+    for run in ["cold_start", "warm_start"]:
+        tokenizer = MultilingualTokenizer(
+            stopwords_folder_path=stopwords_folder_path, snapshot_cache_folder_path=str(tmp_path)
+        )
+        tokenized_documents[run] = [
+            [(token.text, token.is_stop) for token in doc]
+            for language in ["en", "zh"]
+            for doc in tokenizer.tokenize_list(text_list=text_list, language=language)
+        ]
+    assert len(os.listdir(tmp_path)) == 2
+    assert tokenized_documents["cold_start"] == tokenized_documents["warm_start"]
+
+
+def test_tokenize_df_multilingual_missing_language():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", " Les sanglots longs des violons d'automne", "No language", "I am free."],
+            "language": ["en", "fr", None, "en"],
+        },
+        index=[10, 20, 30, 40],
+    )
+    tokenizer = MultilingualTokenizer()
+    output_df = tokenizer.tokenize_df(df=input_df, text_column="input_text", language_column="language")
+    tokenized_documents = output_df[tokenizer.tokenized_column]
+    assert [doc.text for doc in tokenized_documents] == ["I hope nothing.", input_df["input_text"][20], "", "I am free."]
+    assert [len(doc) for doc in tokenized_documents] == [4, 8, 0, 4]
+
+
+def test_tokenize_list_max_num_pipelines():
+    tokenizer = MultilingualTokenizer(max_num_pipelines=2)
+    for language in ["en", "fr", "en", "de"]:
+        tokenizer.tokenize_list(text_list=["I hope nothing."], language=language)
+    assert list(tokenizer.spacy_nlp_dict.keys()) == ["en", "de"]
+
+
+def test_tokenize_list_max_num_pipelines_lemmatization():
+    tokenizer = MultilingualTokenizer(max_num_pipelines=1)
+    tokenizer.add_spacy_tokenizer("en")
+    tokenizer._activate_components_to_lemmatize("en")
+    for language in ["fr", "en"]:
+        tokenized_documents = tokenizer.tokenize_list(text_list=["The cats were running quickly"], language=language)
+    assert list(tokenizer.spacy_nlp_dict.keys()) == ["en"]
+    assert "lemmatizer" in tokenizer.spacy_nlp_dict["en"].pipe_names
+    assert [t.lemma_ for t in tokenized_documents[0]] == ["The", "cat", "be", "run", "quickly"]
+    tokenizer.spacy_nlp_dict["en"].add_pipe("sentencizer")
+    tokenizer.tokenize_list(text_list=["Les chats"], language="fr")
+    assert list(tokenizer.spacy_nlp_dict.keys()) == ["en", "fr"]
+
+
+def test_tokenize_list_max_pipelines_num_bytes():
+    tokenizer = MultilingualTokenizer(max_pipelines_num_bytes=10 ** 7)
+    for language in ["fr", "en"]:
+        tokenizer.add_spacy_tokenizer(language)
+    assert list(tokenizer.spacy_nlp_dict.keys()) == ["fr", "en"]
+    tokenizer._activate_components_to_lemmatize("fr")  # lemmatization tables take about 100 MB
+    assert tokenizer._estimate_pipeline_num_bytes(tokenizer.spacy_nlp_dict["fr"]) > 10 ** 7
+    tokenizer.add_spacy_tokenizer("de")
+    assert list(tokenizer.spacy_nlp_dict.keys()) == ["en", "de"]
+
+
+def test_prewarm():
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    prewarm_future = tokenizer.prewarm(["en", "fr"])
+    tokenized_documents = tokenizer.tokenize_list(text_list=["I hope nothing."], language="en")
+    prewarm_future.result()
+    assert set(tokenizer.spacy_nlp_dict.keys()) == {"en", "fr"}
+    assert [len(doc) for doc in tokenized_documents] == [4]
+    tokenizer.close()
+
+
+def test_tokenize_list_missing_values():
+    text_series = pd.Series(["I hope nothing.", None, "I fear nothing."], dtype="string")
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    tokenized_documents = tokenizer.tokenize_list(text_list=text_series, language="en")
+    assert [doc.text for doc in tokenized_documents] == ["I hope nothing.", "", "I fear nothing."]
+    tokenized_documents = tokenizer.tokenize_list(text_list=text_series.to_numpy(dtype=object), language="en")
+    assert [doc.text for doc in tokenized_documents] == ["I hope nothing.", "", "I fear nothing."]
+
+
+def test_tokenize_chunks_iter():
+    text_list = ["I hope nothing. I fear nothing. I am free.", "Les sanglots longs", "短"]
+    tokenizer = MultilingualTokenizer(max_chunk_num_characters=20)
+    tokenized_chunks = list(tokenizer.tokenize_chunks_iter(text_list, language="en"))
+    assert [(position, doc.text) for position, doc in tokenized_chunks] == [
+        (0, "I hope nothing. "),
+        (0, "I fear nothing. "),
+        (0, "I am free."),
+        (1, "Les sanglots longs"),
+        (2, "短"),
+    ]
+
+
+def test_tokenize_iter_adaptive_batches():
+    text_list = ["I hope nothing. I fear nothing. I am free.", "", "Les sanglots longs", "I am free."] * 5
+    tokenizer = MultilingualTokenizer(max_batch_num_characters=30, sort_by_length=True)
+    tokenizer.LENGTH_BUCKETS_NUM_BATCHES = 2
+    batches = list(tokenizer._iter_batches(iter(text_list)))
+    assert [text for batch in batches for text in batch] == text_list
+    assert all(sum(len(text) + 1 for text in batch[:-1]) < 30 for batch in batches)
+    tokenized_documents = list(tokenizer.tokenize_iter(text_list, language="en"))
+    assert [doc.text for doc in tokenized_documents] == text_list
+
+
+def test_pipe_task_model_components():
+    tokenizer = MultilingualTokenizer(use_models=True, pipe_task="tokenize")
+    assert not tokenizer._uses_model("en")
+    assert tokenizer._uses_model("zh")
+    assert "tagger" in tokenizer._get_model_components_to_exclude("zh")
+    tokenizer = MultilingualTokenizer(use_models=True, pipe_task="lemmatize", enable_pipe_components="ner")
+    assert tokenizer._get_model_components_to_exclude("en") == ["morphologizer", "parser", "senter"]
+    assert tokenizer._get_model_components_to_exclude("fr") == ["tagger", "parser", "senter", "attribute_ruler"]
+    with pytest.raises(ValueError):
+        MultilingualTokenizer(pipe_task="parse")
+
+
+def test_pipe_task_disable_pipe_components():
+    tokenizer = MultilingualTokenizer(use_models=True, pipe_task="lemmatize", disable_pipe_components=["ner"])
+    assert "ner" in tokenizer._get_model_components_to_exclude("en")
+    tokenized_documents = tokenizer.tokenize_list(text_list=["Szeretem a macskákat"], language="hu")
+    assert [len(doc) for doc in tokenized_documents] == [3]
+
+
+def test_segmenter_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("spacy_tokenizer._READY_SEGMENTERS", {})
+    monkeypatch.setenv("PYTHAINLP_DATA_DIR", "")
+    tokenizer = MultilingualTokenizer(segmenter_cache_folder_path=str(tmp_path))
+    other_tokenizer = MultilingualTokenizer(segmenter_cache_folder_path=str(tmp_path))
+    tokenizer.add_spacy_tokenizer("ja")
+    other_tokenizer.add_spacy_tokenizer("ja")
+    sudachi_tokenizer = tokenizer.spacy_nlp_dict["ja"].tokenizer.tokenizer
+    assert other_tokenizer.spacy_nlp_dict["ja"].tokenizer.tokenizer is sudachi_tokenizer
+    tokenizer.add_spacy_tokenizer("th")
+    assert os.environ["PYTHAINLP_DATA_DIR"] == os.path.join(str(tmp_path), "th")
+    other_tokenizer = MultilingualTokenizer(segmenter_cache_folder_path=str(tmp_path / "other"))
+    other_tokenizer.add_spacy_tokenizer("th")
+    assert os.environ["PYTHAINLP_DATA_DIR"] == os.path.join(str(tmp_path), "other", "th")
+
+
+def test_segmenter_cache_unusable_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr("spacy_tokenizer._READY_SEGMENTERS", {})
+    monkeypatch.setenv("PYTHAINLP_DATA_DIR", "")
+    (tmp_path / "file").write_text("")
+    tokenizer = MultilingualTokenizer(segmenter_cache_folder_path=str(tmp_path / "file"))
+    tokenized_documents = tokenizer.tokenize_list(text_list=["ภาษาไทย"], language="th")
+    assert [doc.text for doc in tokenized_documents] == ["ภาษาไทย"]
+    assert not os.environ["PYTHAINLP_DATA_DIR"].startswith(str(tmp_path))
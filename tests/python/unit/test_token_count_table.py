@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# This is a test file intended to be used with pytest
+# pytest automatically runs all the function starting with "test_"
+# see https://docs.pytest.org for more information
+
+from collections import Counter
+
+from spacy.strings import hash_string
+
+from token_count_table import TokenCountTable
+
+
+def test_get_row_counts_max_words():
+    counts = TokenCountTable.from_counters(["a"], [Counter({"hope": 1, "nothing": 2, "fear": 1, "free": 2})])
+    assert list(counts.get_row_counts(0).items()) == [("hope", 1), ("nothing", 2), ("fear", 1), ("free", 2)]
+    assert list(counts.get_row_counts(0, max_words=3).items()) == [("hope", 1), ("nothing", 2), ("free", 2)]
+
+
+def test_merge_and_totals():
+    counts = TokenCountTable.from_counters(["a", "b"], [Counter({"hope": 1}), Counter({"fear": 2})])
+    other_counts = TokenCountTable.from_counters(["c", "a"], [Counter({"free": 3}), Counter({"fear": 1, "hope": 4})])
+    counts.merge(other_counts)
+    assert counts.to_list() == [("a", {"hope": 5, "fear": 1}), ("b", {"fear": 2}), ("c", {"free": 3})]
+    assert dict(zip(counts.tokens, counts.totals().tolist())) == {"hope": 5, "fear": 3, "free": 3}
+    assert len(counts) == 3
+
+
+def test_fold_case():
+    counts = TokenCountTable.from_counters(
+        ["a", "b"],
+        [Counter({"The": 3, "the": 5, "best": 3, "Best": 4}), Counter({"Hope": 2, "HOPE": 1, "hope": 2, "The": 1})],
+    )
+    folded_counts = counts.fold_case()
+    assert list(folded_counts.get_row_counts(0).items()) == [("Best", 7), ("the", 8)]
+    assert list(folded_counts.get_row_counts(1).items()) == [("hope", 5), ("The", 1)]
+
+
+def test_approximate_counting_error_bounds():
+    counts = TokenCountTable(["a", "b"], max_num_tokens_per_row=3)
+    counts.MAX_NUM_PENDING_COUNTS = 2  # merge and truncate rows after every few counts
+    true_counts = [Counter(), Counter()]
+    for i in range(40):
+        row, token = i % 2, ["hope", "fear", "free"][i % 3] if i % 4 else f"rare{i}"
+        true_counts[row][token] += 1
+        counts.add_counts([row], [counts.get_column(hash_string(token), token)], [1])
+    error_bounds = counts.get_error_bounds()
+    assert error_bounds.tolist()[1] > 0
+    for row, true_counter in enumerate(true_counts):
+        row_counts = counts.get_row_counts(row)
+        assert len(row_counts) <= 3
+        assert all(
+            true_counter[token] <= count <= true_counter[token] + error_bounds[row]
+            for token, count in row_counts.items()
+        )
+        assert all(count <= error_bounds[row] for token, count in true_counter.items() if token not in row_counts)
+    assert set(counts.get_row_counts(1)) == {"hope", "fear", "free"}
+
+
+def test_approximate_counting_compacts_columns():
+    counts = TokenCountTable(["a"], max_num_tokens_per_row=2)
+    for i in range(1000):
+        token = "hope" if i % 2 else f"rare{i}"
+        counts.add_counts([0], [counts.get_column(hash_string(token), token)], [1])
+    assert counts.matrix.shape == (1, 2)
+    assert counts.num_compactions == 1
+    assert len(counts.tokens) == len(counts.token_ids) == len(counts.lower_token_ids) == 2
+    assert counts.get_row_counts(0)["hope"] == 500
+    assert counts.get_column(hash_string("hope"), "hope") == counts.tokens.index("hope")
+
+
+def test_approximate_counting_case_insensitive():
+    counts = TokenCountTable(["a"], max_num_tokens_per_row=2, case_insensitive=True)
+    counts.MAX_NUM_PENDING_COUNTS = 2  # merge and truncate rows after every few counts
+    for token in ["Hope", "hope", "HOPE", "x"] * 3 + ["y", "z"]:
+        counts.add_counts([0], [counts.get_column(hash_string(token), token, hash_string(token.lower()))], [1])
+    error_bound = counts.get_error_bounds()[0]
+    folded_counts = counts.fold_case().get_row_counts(0)
+    assert 9 <= folded_counts["hope"] <= 9 + error_bound
+    assert len(folded_counts) == 2
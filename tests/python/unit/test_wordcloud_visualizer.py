@@ -4,13 +4,17 @@
 # see https://docs.pytest.org for more information
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 from collections import Counter
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont
 
+from font_cache import get_font
 from spacy_tokenizer import MultilingualTokenizer
 from wordcloud_visualizer import WordcloudVisualizer
+from token_count_table import TokenCountTable
 
 font_folder_path = os.getenv("FONT_FOLDER_PATH", "path_is_no_good")
 stopwords_folder_path = os.getenv("STOPWORDS_FOLDER_PATH", "path_is_no_good")
@@ -24,7 +28,7 @@ def test_tokenize_and_count_english():
         tokenizer=tokenizer, text_column="input_text", font_folder_path=font_folder_path, language="en"
     )
     frequencies = worcloud_visualizer.tokenize_and_count(input_df)
-    assert frequencies == [("", {"hope": 1, "nothing": 2, "fear": 1, "free": 1, "💩": 1, "😂": 1, "#OMG": 1})]
+    assert frequencies.to_list() == [("", {"hope": 1, "nothing": 2, "fear": 1, "free": 1, "💩": 1, "😂": 1, "#OMG": 1})]
 
 
 def test_tokenize_and_count_multilingual():
@@ -51,7 +55,7 @@ def test_tokenize_and_count_multilingual():
         case_insensitive=True,
     )
     frequencies = worcloud_visualizer.tokenize_and_count(input_df)
-    assert frequencies == [
+    assert frequencies.to_list() == [
         ("en", Counter({"hope": 1, "Nothing": 3, "fear": 1, "free": 1})),
         ("fr", Counter({"sanglots": 1, "longs": 1, "violons": 1, "automne": 1})),
         ('zh', Counter({'不學則': 1, '不思則': 1, '子': 1, '學而': 1, '思而': 1, '曰': 1, '罔': 1}))
@@ -118,3 +122,234 @@ def test_wordcloud_deterministic():
     for temp, output_file_name in worcloud_visualizer.generate_wordclouds(frequencies):
         generated_test_image = Image.open(temp)
         assert list(generated_test_image.getdata()) == list(reference_test_image.getdata())
+
+
+def test_tokenize_and_count_multiple_batches():
+    input_df = pd.DataFrame({"input_text": ["I hope nothing.", "I fear nothing.", "I am free.", "Nothing!", "hope"]})
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path, batch_size=2)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer, text_column="input_text", font_folder_path=font_folder_path, language="en"
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [("", {"hope": 2, "nothing": 2, "fear": 1, "free": 1, "Nothing": 1})]
+
+
+def test_tokenize_and_count_subcharts():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", "I fear nothing.", "Les sanglots longs", "Nothing!", "hope"],
+            "language": ["en", "en", "fr", "en", "en"],
+            "product": ["b", "a", "b", "a", "b"],
+        }
+    )
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path, batch_size=2)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer,
+        text_column="input_text",
+        font_folder_path=font_folder_path,
+        language="language_column",
+        language_column="language",
+        subchart_column="product",
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [
+        ("a", {"fear": 1, "nothing": 1, "Nothing": 1}),
+        ("b", {"hope": 2, "nothing": 1, "sanglots": 1, "longs": 1}),
+    ]
+
+
+def test_tokenize_and_count_chunks():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", "Les sanglots longs", "I fear nothing.", "Nothing!", "hope"],
+            "language": ["en", "fr", "en", "en", "en"],
+            "product": ["b", "b", "a", "a", "b"],
+        }
+    )
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer,
+        text_column="input_text",
+        font_folder_path=font_folder_path,
+        language="language_column",
+        language_column="language",
+        subchart_column="product",
+        case_insensitive=True,
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count_chunks(
+        input_df.iloc[start : start + 2].copy() for start in range(0, len(input_df.index), 2)
+    )
+    assert frequencies.to_list() == [
+        ("a", {"fear": 1, "nothing": 2}),
+        ("b", {"hope": 2, "nothing": 1, "sanglots": 1, "longs": 1}),
+    ]
+    assert frequencies.to_list() == worcloud_visualizer.tokenize_and_count(input_df).to_list()
+
+
+def test_tokenize_and_count_duplicates():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", "I fear nothing.", "I hope nothing.", "I hope nothing.", None],
+            "product": ["a", "a", "b", "a", "a"],
+        }
+    )
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer, text_column="input_text", font_folder_path=font_folder_path, subchart_column="product"
+    )
+    unique_texts, subchart_codes, text_weights = worcloud_visualizer._deduplicate_texts(
+        input_df["input_text"], np.array([0, 0, 1, 0, 0]), np.ones(5, dtype=np.int64)
+    )
+    assert unique_texts.tolist()[:3] == ["I hope nothing.", "I fear nothing.", "I hope nothing."]
+    assert subchart_codes.tolist() == [0, 0, 1, 0]
+    assert text_weights.tolist() == [2, 1, 1, 1]
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [("a", {"hope": 2, "nothing": 3, "fear": 1}), ("b", {"hope": 1, "nothing": 1})]
+
+
+def test_tokenize_and_count_weights():
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", "I fear nothing.", "I hope nothing.", "I am free."],
+            "weight": [2, 0.5, 1, -1],
+        }
+    )
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer, text_column="input_text", font_folder_path=font_folder_path, weight_column="weight"
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [("", {"hope": 3, "nothing": 3.5, "fear": 0.5})]
+
+
+def test_tokenize_and_count_int_weights_missing_values():
+    # Integer columns of the dataset schema are read as nullable integers, see `iter_input_data_wordcloud`
+    input_df = pd.DataFrame(
+        {
+            "input_text": ["I hope nothing.", "I fear nothing.", "I am free."],
+            "subchart": pd.array([1, 2, 1], dtype="Int64"),
+            "weight": pd.array([2, None, 1], dtype="Int64"),
+        }
+    )
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer,
+        text_column="input_text",
+        font_folder_path=font_folder_path,
+        subchart_column="subchart",
+        weight_column="weight",
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [(1, {"hope": 2, "nothing": 2, "free": 1})]
+
+
+def test_tokenize_and_count_long_text():
+    input_df = pd.DataFrame({"input_text": ["I hope nothing. I fear nothing. I am free.", "hope"]})
+    tokenizer = MultilingualTokenizer(stopwords_folder_path=stopwords_folder_path, max_num_characters=20)
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=tokenizer, text_column="input_text", font_folder_path=font_folder_path
+    )
+    frequencies = worcloud_visualizer.tokenize_and_count(input_df)
+    assert frequencies.to_list() == [("", {"hope": 2, "nothing": 2, "fear": 1, "free": 1})]
+
+
+def test_wordcloud_multiprocess():
+    counts = TokenCountTable.from_counters(
+        ["a", "b", "c"],
+        [Counter({"hope": 2, "fear": 1}), Counter({"nothing": 3, "free": 2, "hope": 1}), Counter({"violons": 1})],
+    )
+    wordclouds = {}
+    for n_process in [1, 2]:
+        worcloud_visualizer = WordcloudVisualizer(
+            tokenizer=MultilingualTokenizer(),
+            text_column="input_text",
+            font_folder_path=font_folder_path,
+            subchart_column="product",
+            scale=1,
+            figsize=(4, 3),
+            n_process=n_process,
+        )
+        wordclouds[n_process] = [
+            (temp.getvalue(), name) for temp, name in worcloud_visualizer.generate_wordclouds(counts)
+        ]
+    assert [name for _, name in wordclouds[2]] == [
+        "wordcloud_product_a.png",
+        "wordcloud_product_b.png",
+        "wordcloud_product_c.png",
+    ]
+    assert wordclouds[2] == wordclouds[1]
+    worcloud_visualizer.n_process = -1
+    assert 1 <= worcloud_visualizer._get_num_process() <= WordcloudVisualizer.MAX_NUM_PROCESS
+
+
+def test_wordcloud_pil_renderer():
+    counts = TokenCountTable.from_counters(["a"], [Counter({"hope": 2, "fear": 1, "nothing": 3})])
+    images = {}
+    for renderer in ["matplotlib", "pil"]:
+        worcloud_visualizer = WordcloudVisualizer(
+            tokenizer=MultilingualTokenizer(),
+            text_column="input_text",
+            font_folder_path=font_folder_path,
+            subchart_column="product",
+            figsize=(19.2, 10.8),
+            renderer=renderer,
+        )
+        for temp, _ in worcloud_visualizer.generate_wordclouds(counts):
+            images[renderer] = np.asarray(Image.open(temp).convert("RGB"), dtype=np.int16)
+    assert images["pil"].shape == images["matplotlib"].shape
+    assert np.abs(images["pil"] - images["matplotlib"]).mean() < 1
+
+
+def test_wordcloud_threads():
+    counts = TokenCountTable.from_counters(
+        ["a", "b"], [Counter({"hope": 2, "fear": 1}), Counter({"nothing": 3, "free": 2, "hope": 1})]
+    )
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=MultilingualTokenizer(),
+        text_column="input_text",
+        font_folder_path=font_folder_path,
+        scale=1,
+        figsize=(4, 3),
+    )
+    charts = [(count, "en", f"product: {name}") for name, count in counts.items()]
+    serial_charts = [worcloud_visualizer._render_wordcloud(*chart).getvalue() for chart in charts]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        threaded_charts = list(executor.map(lambda chart: worcloud_visualizer._render_wordcloud(*chart), charts))
+    assert [temp.getvalue() for temp in threaded_charts] == serial_charts
+
+
+def test_font_cache(monkeypatch):
+    font_path = os.path.join(font_folder_path, WordcloudVisualizer.DEFAULT_FONT)
+    assert get_font(font_path, 20) is get_font(font_path, 20)
+    frequencies = {"hope": 5, "fear": 3, "nothing": 2, "free": 1}
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=MultilingualTokenizer(), text_column="input_text", font_folder_path=font_folder_path
+    )
+    cached_wordcloud = worcloud_visualizer._get_wordcloud(frequencies, font_path)
+    monkeypatch.setattr("wordcloud.wordcloud.ImageFont", ImageFont)
+    wordcloud = worcloud_visualizer._get_wordcloud(frequencies, font_path)
+    assert cached_wordcloud.layout_ == wordcloud.layout_
+    assert cached_wordcloud.to_image().tobytes() == wordcloud.to_image().tobytes()
+
+
+def test_wordcloud_spiral_layout():
+    frequencies = {f"word{i}": 100 - i for i in range(100)}
+    worcloud_visualizer = WordcloudVisualizer(
+        tokenizer=MultilingualTokenizer(),
+        text_column="input_text",
+        font_folder_path=font_folder_path,
+        layout_engine="spiral",
+    )
+    font_path = os.path.join(font_folder_path, WordcloudVisualizer.DEFAULT_FONT)
+    wordcloud = worcloud_visualizer._get_wordcloud(frequencies, font_path)
+    assert len(wordcloud.layout_) > 10
+    assert wordcloud.layout_ == worcloud_visualizer._get_wordcloud(frequencies, font_path).layout_
+    # Words do not overlap: each pixel of the layout image is drawn by at most one word
+    word_pixels = np.zeros((wordcloud.height, wordcloud.width), dtype=int)
+    for (word, _), font_size, (x, y), orientation, _ in wordcloud.layout_:
+        word_image = Image.new("L", (wordcloud.width, wordcloud.height))
+        font = ImageFont.TransposedFont(ImageFont.truetype(font_path, font_size), orientation=orientation)
+        ImageDraw.Draw(word_image).text((y, x), word, fill="white", font=font)
+        word_pixels += np.asarray(word_image) > 0
+    assert word_pixels.max() == 1
+    assert wordcloud.to_image().size == (wordcloud.width * wordcloud.scale, wordcloud.height * wordcloud.scale)